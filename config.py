@@ -6,12 +6,26 @@ WIFI_PASSWORD = 'hello123'
 KV_BASE_URL = 'https://mem-kv.bitsflow.org/dashboard/'
 ALIGN_MINUTES = 60
 
+# 刷新后把驱动分阶段耗时上报到 KV_BASE_URL + TELEMETRY_KEY
+TELEMETRY_ENABLED = False
+TELEMETRY_KEY = 'telemetry'
+
 # Time Configuration
 TIMEZONE_OFFSET = 8  # Beijing Time (UTC+8)
 
 # Power Configuration
 DEEP_SLEEP_ENABLED = True
+# 画面未变化时跳过刷新，但每隔 N 次唤醒强制全刷一次以消除残影（0 表示不强制）
+FORCE_REFRESH_EVERY = 24
+# 黄色层未变化时使用黑白快刷（寄存器 LUT），否则一律三色全刷
+FAST_REFRESH_ENABLED = True
 
 # 统一字体支持（16×16 中英文）
 ENABLE_UNIFIED_FONT = True
 UNIFIED_FONT_FILE = 'unified_font.bin'
+# 完整字形缓存条目数（每条 32 字节；ASCII 等裁剪后的小字形另有 16 字节槽的缓存），None 表示按空闲内存自动确定
+GLYPH_CACHE_SIZE = None
+# 字形包：tools/subset_font.py 按 info1/info2 当前内容生成并上传到 KV_BASE_URL + GLYPH_PACK_KEY，
+# 每次唤醒随内容下载到 GLYPH_PACK_FILE，绘制时优先使用；设为 None 关闭
+GLYPH_PACK_KEY = 'glyphs'
+GLYPH_PACK_FILE = 'glyphs.bin'
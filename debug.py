@@ -66,8 +66,12 @@ def test_sensor():
         print("Sensor not available")
 
 
-def test_display():
-    """测试墨水屏显示"""
+def test_display(dump=False):
+    """
+    测试墨水屏显示
+    dump=True 时把每个图层的帧缓冲以 RLE 文本转储到串口，
+    保存日志后可在主机上用 tools/fb_dump.py 还原为 PBM/PNG 进行比对
+    """
     print("\n=== Display Test ===")
     
     print("1. Initializing Display...")
@@ -86,12 +90,16 @@ def test_display():
     fb.rect(0, 0, 800, 480, black)
     fb.line(0, 0, 800, 480, black)
     fb.line(800, 0, 0, 480, black)
+    if dump:
+        fb.print()
     epd.write_black_layer(buf)
     
     fb.fill(white)
     fb.text("Yellow Layer Test", 50, 150, black, size=2)
     fb.fill_rect(400, 200, 100, 100, black)
     fb.circle(200, 300, 50, black)
+    if dump:
+        fb.print()
     epd.write_yellow_layer(buf, refresh=True)
     
     print("4. Display Test Complete.")
@@ -113,6 +121,9 @@ def test_wake_scheduler():
     scheduler = pwr.WakeScheduler()
     wake_count = scheduler.get_wake_count()
     print(f"Wake count: {wake_count}")
+    timings = pwr.load_epd_timings()
+    if timings:
+        print(f"Last EPD timings: {timings.summary()}")
 
 
 def run_all_tests():
@@ -5,9 +5,33 @@ MicroPython Waveshare 7.5" Black/White/Red GDEY075Z08 e-paper display driver
 MicroPython Waveshare 7.5" Black/White/Yellow GDEW075C64 e-paper display driver
 """
 
-from micropython import const
-from utime import sleep_ms
-import ustruct
+try:
+    from micropython import const
+except ImportError:  # CPython: 主机侧测试 / 模拟器
+    def const(x):
+        return x
+
+try:
+    from utime import sleep_ms, ticks_ms, ticks_us, ticks_diff
+except ImportError:
+    from time import sleep as _sleep, monotonic as _monotonic
+
+    def sleep_ms(ms):
+        _sleep(ms / 1000)
+
+    def ticks_ms():
+        return int(_monotonic() * 1000)
+
+    def ticks_us():
+        return int(_monotonic() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+try:
+    import ustruct
+except ImportError:
+    import struct as ustruct
 
 # Display resolution
 # https://www.e-paper-display.cn/products_detail/productId=474.html
@@ -52,19 +76,101 @@ GET_STATUS = 0x71
 AUTO_MEASUREMENT_VCOM = 0x80
 READ_VCOM_VALUE = 0x81
 VCM_DC_SETTING = 0x82
+PARTIAL_WINDOW = 0x90
+PARTIAL_IN = 0x91
+PARTIAL_OUT = 0x92
 FLASH_MODE = const(0xE5)
 
 BUSY = const(0)  # 0=busy, 1=idle
 WHITE = const(0xFF)
 
+# 帧数据按块推送的默认大小（字节），整个图层在一次 CS 拉低期间发完
+CHUNK_SIZE = const(4096)
+# BUSY 等待：轮询间隔、端口不支持 GPIO 唤醒时浅睡眠的单次时长，以及整次等待的超时（毫秒）
+BUSY_POLL_MS = const(10)
+LIGHT_SLEEP_MS = const(50)
+BUSY_TIMEOUT_MS = const(40000)
+# 清屏用白色条带的行数，条带在首次使用时分配并复用
+WHITE_STRIPE_ROWS = const(8)
+
 black = yellow = 0
 white = 1
 
+# 刷新模式
+REFRESH_FULL = const(0)  # OTP 中的完整三色波形，约 15 秒
+REFRESH_FAST = const(1)  # 寄存器 LUT 的纯黑白波形，黄色粒子保持不动
+REFRESH_MODE_NAMES = ('full', 'fast')
+
+PANEL_SETTING_FULL = b'\xCF\x08'  # KWR 模式，LUT 来自 OTP
+PANEL_SETTING_FAST = b'\xFF\x08'  # KW 模式，LUT 来自寄存器
+
+# 快刷 LUT：7 组 × 6 字节（电平选择、4 个阶段的帧数、重复次数），只用第一组。
+# 掉电后不保留旧画面，因此按新像素颜色选择波形：新像素为白时 WW/KW 都驱动到白，为黑时 WK/KK 都驱动到黑。
+# 帧数为经验值，需按实际面板与温度调校；残影由周期性的三色全刷清除。
+LUT_VCOM_FAST = b'\x00\x0A\x0A\x00\x00\x01' + bytes(36)
+LUT_TO_WHITE_FAST = b'\x80\x0A\x0A\x00\x00\x01' + bytes(36)
+LUT_TO_BLACK_FAST = b'\x40\x0A\x0A\x00\x00\x01' + bytes(36)
+
 DEBUG = False
 
+# 计时阶段，init 的耗时包含其中的 reset
+PHASE_RESET = const(0)
+PHASE_INIT = const(1)
+PHASE_BLACK = const(2)
+PHASE_YELLOW = const(3)
+PHASE_REFRESH = const(4)
+PHASE_SLEEP = const(5)
+PHASE_NAMES = ('reset', 'init', 'black', 'yellow', 'refresh', 'sleep')
+
+
+class EPDTimings:
+    """
+    驱动各阶段的定长计时记录（opt-in，通过 EPD.instrument() 启用）。
+    记录每个阶段的累计微秒数、图层上传字节数和最近一次刷新模式，
+    pack() 得到 SIZE 字节的紧凑记录，可写入 RTC 内存或上报到 KV 服务。
+    """
+    FORMAT = '<6IIB'
+    SIZE = ustruct.calcsize(FORMAT)
+
+    def __init__(self):
+        self.spans_us = [0] * len(PHASE_NAMES)
+        self.bytes = 0
+        self.mode = REFRESH_FULL
+
+    def add(self, phase, us, nbytes=0):
+        self.spans_us[phase] += us
+        self.bytes += nbytes
+
+    def upload_us(self):
+        return self.spans_us[PHASE_BLACK] + self.spans_us[PHASE_YELLOW]
+
+    def throughput(self):
+        """图层上传的平均吞吐量（字节/秒）"""
+        us = self.upload_us()
+        return self.bytes * 1000000 // us if us else 0
+
+    def pack(self):
+        return ustruct.pack(self.FORMAT, *(self.spans_us + [self.bytes, self.mode]))
+
+    @classmethod
+    def unpack(cls, data):
+        fields = ustruct.unpack(cls.FORMAT, data)
+        t = cls()
+        t.spans_us = list(fields[:len(PHASE_NAMES)])
+        t.bytes, t.mode = fields[len(PHASE_NAMES):]
+        return t
+
+    def summary(self):
+        parts = [f"{name}={us // 1000}ms" for name, us in zip(PHASE_NAMES, self.spans_us)]
+        parts.append(f"bytes={self.bytes}")
+        parts.append(f"spi={self.throughput() // 1024}KB/s")
+        parts.append(f"mode={REFRESH_MODE_NAMES[self.mode]}")
+        return " ".join(parts)
+
 
 class EPD:
-    def __init__(self, spi, cs, dc, rst, busy, yellow_bounds=(64, 192)):
+    def __init__(self, spi, cs, dc, rst, busy, yellow_bounds=(64, 192), chunk_size=CHUNK_SIZE,
+                 busy_timeout_ms=BUSY_TIMEOUT_MS):
         self.spi = spi
         self.cs = cs
         self.dc = dc
@@ -77,6 +183,15 @@ class EPD:
         self.width = EPD_WIDTH
         self.height = EPD_HEIGHT
         self.yellow_bounds = yellow_bounds
+        self.chunk_size = chunk_size
+        self._white = None
+        self._window = None  # 局部刷新窗口 (x0, y0, x1, y1)，x 按 8 像素对齐，右/下边界不含
+        self.busy_timeout_ms = busy_timeout_ms
+        self.last_busy_ms = 0  # 最近一次 BUSY 等待的实测时长
+        self.refresh_mode = REFRESH_FULL
+        # 每种刷新模式的耗时统计: 模式名 -> [次数, 最近一次 ms, 累计 ms]
+        self.refresh_stats = {}
+        self.timings = None  # EPDTimings，instrument() 启用后记录各阶段耗时
         self._inited = False
 
     def _command(self, command, data=None):
@@ -95,15 +210,63 @@ class EPD:
         self.spi.write(data)
         self.cs(1)
 
+    def _data_stream(self, buf):
+        """在一次 CS 拉低期间，按 chunk_size 分块把整段数据推给 SPI"""
+        if not isinstance(buf, (bytes, bytearray, memoryview)):
+            buf = bytearray(buf)
+        mv = memoryview(buf)
+        step = self.chunk_size
+        self.dc(1)
+        self.cs(0)
+        for i in range(0, len(mv), step):
+            self.spi.write(mv[i:i + step])
+        self.cs(1)
+
+    def instrument(self, timings=None):
+        """启用分阶段计时，返回记录对象"""
+        self.timings = timings or EPDTimings()
+        return self.timings
+
+    def _begin(self):
+        return ticks_us() if self.timings is not None else 0
+
+    def _end(self, phase, start, nbytes=0):
+        if self.timings is not None:
+            self.timings.add(phase, ticks_diff(ticks_us(), start), nbytes)
+
+    def _layer_bytes(self):
+        """当前窗口（或整屏）一个图层的字节数"""
+        if self._window is None:
+            return self.width * self.height // 8
+        x0, y0, x1, y1 = self._window
+        return (x1 - x0) // 8 * (y1 - y0)
+
+    def _white_stripe(self):
+        if self._white is None:
+            self._white = bytes([WHITE]) * (self.width // 8 * WHITE_STRIPE_ROWS)
+        return self._white
+
+    def _fill_layer(self, command):
+        """在一次 CS 拉低期间重复推送白色条带，填满整个图层"""
+        stripe = self._white_stripe()
+        total = self._layer_bytes()
+        self._command(command)
+        self.dc(1)
+        self.cs(0)
+        for i in range(0, total, len(stripe)):
+            self.spi.write(stripe if total - i >= len(stripe) else memoryview(stripe)[:total - i])
+        self.cs(1)
+
     def init(self):
         if self._inited:
             return
         self._inited = True
 
         print('init...')
+        t = self._begin()
         self.reset()
         self._command(POWER_SETTING, b'\x37\x00')
-        self._command(PANEL_SETTING, b'\xCF\x08')
+        self._command(PANEL_SETTING, PANEL_SETTING_FULL)
         self._command(BOOSTER_SOFT_START, b'\xC7\xCC\x28')
         self._command(POWER_ON)
         self.wait_until_idle()
@@ -114,80 +277,246 @@ class EPD:
         self._command(TCON_RESOLUTION, ustruct.pack(">HH", EPD_WIDTH, EPD_HEIGHT))
         self._command(VCM_DC_SETTING, b'\x1E')  # decide by LUT file
         self._command(FLASH_MODE, b'\x03')
+        if self.refresh_mode != REFRESH_FULL:
+            self._apply_refresh_mode()
+        self._end(PHASE_INIT, t)
         print('inited.')
 
-    def wait_until_idle(self):
-        ms = 100
-        ms_max = 3000
-        while self.busy.value() == BUSY:
-            if ms < ms_max:
-                ms *= 2
-            sleep_ms(min(ms, ms_max))
+    def set_refresh_mode(self, mode):
+        """选择 REFRESH_FULL / REFRESH_FAST；未初始化时在 init() 中生效"""
+        if mode not in (REFRESH_FULL, REFRESH_FAST):
+            raise ValueError("Bad refresh mode")
+        if mode == self.refresh_mode:
+            return
+        self.refresh_mode = mode
+        if self._inited:
+            self._apply_refresh_mode()
+
+    def _apply_refresh_mode(self):
+        if self.refresh_mode == REFRESH_FAST:
+            self._command(PANEL_SETTING, PANEL_SETTING_FAST)
+            self._command(LUT_FOR_VCOM, LUT_VCOM_FAST)
+            self._command(LUT_BLUE, LUT_TO_WHITE_FAST)  # WW
+            self._command(LUT_WHITE, LUT_TO_WHITE_FAST)  # KW
+            self._command(LUT_GRAY_1, LUT_TO_BLACK_FAST)  # WK
+            self._command(LUT_GRAY_2, LUT_TO_BLACK_FAST)  # KK
+        else:
+            self._command(PANEL_SETTING, PANEL_SETTING_FULL)
+
+    def wait_until_idle(self, timeout_ms=None, light_sleep=False):
+        """
+        等待 BUSY 引脚变为空闲，返回本次忙碌时长（毫秒），同时记录到 last_busy_ms。
+        默认每 BUSY_POLL_MS 轮询一次，超过 timeout_ms 抛出 RuntimeError。
+        light_sleep=True 时把 BUSY 空闲电平注册为浅睡眠唤醒源（Pin.WAKE_HIGH, wake=machine.SLEEP），
+        一次睡到面板空闲或超时；端口不支持 GPIO 唤醒时退回每 LIGHT_SLEEP_MS 浅睡眠一次再检查。
+        """
+        if timeout_ms is None:
+            timeout_ms = self.busy_timeout_ms
+        start = ticks_ms()
+        nap, nap_ms = sleep_ms, BUSY_POLL_MS
+        wake = False
+        if light_sleep:
+            import machine
+            nap, nap_ms = machine.lightsleep, LIGHT_SLEEP_MS
+            try:
+                self.busy.irq(trigger=self.busy.WAKE_HIGH, wake=machine.SLEEP)
+                wake = True
+                nap_ms = timeout_ms
+            except (AttributeError, TypeError, ValueError):
+                pass
+
+        try:
+            while self.busy.value() == BUSY:
+                remaining = timeout_ms - ticks_diff(ticks_ms(), start)
+                if remaining <= 0:
+                    raise RuntimeError("EPD busy timeout")
+                nap(min(nap_ms, remaining))
+        finally:
+            if wake:
+                self.busy.irq(handler=None)  # 取消唤醒源
+        self.last_busy_ms = ticks_diff(ticks_ms(), start)
+        return self.last_busy_ms
 
     def reset(self):
+        t = self._begin()
         self.rst(0)
         sleep_ms(200)
         self.rst(1)
         sleep_ms(200)
+        self._end(PHASE_RESET, t)
 
     # to wake call reset() or init()
     def sleep(self):
+        t = self._begin()
         self._command(POWER_OFF)
         self.wait_until_idle()
         self._command(DEEP_SLEEP, b'\xA5')
+        self._end(PHASE_SLEEP, t)
 
     # functions for display
 
     def clear_frame(self, buf_black, buf_yellow=None):
-        for i in range(int(self.width * self.height / 8)):
-            buf_black[i] = WHITE
-            if buf_yellow is not None:
-                buf_yellow[i] = WHITE
+        stripe = self._white_stripe()
+        n = len(stripe)
+        total = self.width * self.height // 8
+        for buf in (buf_black, buf_yellow):
+            if buf is None:
+                continue
+            for i in range(0, total - n + 1, n):
+                buf[i:i + n] = stripe
+            rest = total % n
+            if rest:
+                buf[total - rest:total] = stripe[:rest]
 
-    # copy from https://github.com/zhufucdev/gdey075z08_driver/blob/main/src/gdey075z08_driver/driver.py#L155
-    # pixels of 8bit image with 256 colors of each pixel
-    def get_frame_buffer(self, pixels: [bytes]):
-        buf_black = [WHITE] * int(self.height * self.width / 8)
-        buf_yellow = [0x00] * int(self.height * self.width / 8)
+    # 8 位灰度图转位平面，阈值逻辑参考
+    # https://github.com/zhufucdev/gdey075z08_driver/blob/main/src/gdey075z08_driver/driver.py#L155
+    # 灰度 < yellow_bounds[0] 为黑，< yellow_bounds[1] 为黄，其余为白；两个平面都是 0=上色、1=白
+    def _gray_rows(self, pixels):
+        """把 PIL 图像 / 行优先灰度字节 / PixelAccess 统一成按行取灰度的函数"""
+        w = self.width
+        if hasattr(pixels, 'convert'):
+            pixels = pixels.convert('L').tobytes()
+        if isinstance(pixels, (bytes, bytearray, memoryview)):
+            mv = memoryview(pixels)
+            return lambda y: mv[y * w:(y + 1) * w]
+        return lambda y: bytes(pixels[x, y] for x in range(w))
 
+    @staticmethod
+    def _pack_row(row, out, lo, hi):
+        """把一行灰度中落在 [lo, hi) 的像素打包为 0，其余为 1，写入 out"""
+        i = 0
+        for x in range(len(out)):
+            v = WHITE
+            bit = 0x80
+            while bit:
+                p = row[i]
+                if lo <= p < hi:
+                    v ^= bit
+                bit >>= 1
+                i += 1
+            out[x] = v
+
+    def get_frame_buffer(self, pixels):
+        """
+        返回 (buf_black, buf_yellow) 两个 bytearray 位平面。
+        逐行打包（每行复用缓冲区，不按像素分配内存）；主机侧的 NumPy 版本见 tools/framebuf_host.frame_buffer()。
+        """
+        b0, b1 = self.yellow_bounds
+        row_of = self._gray_rows(pixels)
+        n = self.width // 8
+        buf_black = bytearray(n * self.height)
+        buf_yellow = bytearray(n * self.height)
+        row_black = memoryview(buf_black)
+        row_yellow = memoryview(buf_yellow)
         for y in range(self.height):
-            for x in range(int(self.width / 8)):
-                sign_w = WHITE
-                sign_y = 0x00
-                for i in range(0, 8):
-                    p = pixels[x * 8 + i, y]
-                    # 0x80 = 0b10000000
-                    if p < self.yellow_bounds[0]:
-                        sign_w &= ~(0x80 >> i)  # set from black to black
-                    elif p < self.yellow_bounds[1]:
-                        sign_y |= 0x80 >> i  # set from black to yellow
-                index = x + int(y * self.width / 8)
-                buf_black[index] = sign_w
-                buf_yellow[index] = sign_y
+            row = row_of(y)
+            self._pack_row(row, row_black[y * n:(y + 1) * n], 0, b0)
+            self._pack_row(row, row_yellow[y * n:(y + 1) * n], b0, b1)
         return buf_black, buf_yellow
 
+    def stream_frame(self, pixels, refresh=True):
+        """
+        不生成完整位平面，逐行转换灰度图并直接推给 SPI：黑色层一遍、黄色层一遍，
+        内存占用只有一行缓冲区。快刷模式下跳过黄色层。
+        """
+        row_of = self._gray_rows(pixels)
+        out = bytearray(self.width // 8)
+        b0, b1 = self.yellow_bounds
+        passes = [(PHASE_BLACK, self._black_command(), 0, b0)]
+        if self.refresh_mode != REFRESH_FAST:
+            passes.append((PHASE_YELLOW, DATA_START_TRANSMISSION_2, b0, b1))
+        for phase, command, lo, hi in passes:
+            t = self._begin()
+            self._command(command)
+            self.dc(1)
+            self.cs(0)
+            for y in range(self.height):
+                self._pack_row(row_of(y), out, lo, hi)
+                self.spi.write(out)
+            self.cs(1)
+            self._end(phase, t, len(out) * self.height)
+        if refresh:
+            self.refresh()
+
     def write_buffer(self, buf):
-        for data in buf:
-            self._data(data)
-        sleep_ms(100)
+        """上传整帧缓冲区；设置了局部窗口时只上传窗口内的行片段"""
+        if self._window is None:
+            self._data_stream(buf)
+            return
+        x0, y0, x1, y1 = self._window
+        row = self.width // 8
+        if x0 == 0 and x1 == self.width:
+            self._data_stream(memoryview(buf)[y0 * row:y1 * row])
+            return
+        mv = memoryview(buf)
+        b0, b1 = x0 // 8, x1 // 8
+        self.dc(1)
+        self.cs(0)
+        for y in range(y0, y1):
+            self.spi.write(mv[y * row + b0:y * row + b1])
+        self.cs(1)
+
+    def set_window(self, x, y, w, h):
+        """
+        进入局部刷新模式并设置窗口，x 方向向外扩展到 8 像素对齐。
+        之后的图层写入/清除只传输窗口内的数据，refresh() 后自动退出局部模式。
+        """
+        x0 = max(0, x) & ~7
+        x1 = (min(self.width, x + w) + 7) & ~7
+        y0 = max(0, y)
+        y1 = min(self.height, y + h)
+        if x0 >= x1 or y0 >= y1:
+            raise ValueError("Empty partial window")
+        self._command(PARTIAL_IN)
+        self._command(PARTIAL_WINDOW, ustruct.pack(">HHHHB", x0, x1 - 1, y0, y1 - 1, 0x01))
+        self._window = (x0, y0, x1, y1)
+        return self._window
+
+    def refresh(self):
+        name = REFRESH_MODE_NAMES[self.refresh_mode]
+        print(f'display refresh ({name}) ...')
+        t = self._begin()
+        self._command(DISPLAY_REFRESH)
+        ms = self.wait_until_idle()
+        self._end(PHASE_REFRESH, t)
+        if self.timings is not None:
+            self.timings.mode = self.refresh_mode
+        stats = self.refresh_stats.get(name)
+        if stats is None:
+            stats = self.refresh_stats[name] = [0, 0, 0]
+        stats[0] += 1
+        stats[1] = ms
+        stats[2] += ms
+        if self._window is not None:
+            self._command(PARTIAL_OUT)
+            self._window = None
+
+    def _black_command(self):
+        # KW 模式下 DTM2 是“新画面”，快刷不依赖旧画面，只需上传到 DTM2
+        if self.refresh_mode == REFRESH_FAST:
+            return DATA_START_TRANSMISSION_2
+        return DATA_START_TRANSMISSION_1
 
     def write_black_layer(self, buf, refresh=False):
         print('write_black_layer...')
-        self._command(DATA_START_TRANSMISSION_1)
+        t = self._begin()
+        self._command(self._black_command())
         self.write_buffer(buf)
+        self._end(PHASE_BLACK, t, self._layer_bytes())
         if refresh:
-            print('display refresh ...')
-            self._command(DISPLAY_REFRESH)
-            self.wait_until_idle()
+            self.refresh()
 
     def write_yellow_layer(self, buf, refresh=False):
-        print('write_yellow_layer...')
-        self._command(DATA_START_TRANSMISSION_2)
-        self.write_buffer(buf)
+        if self.refresh_mode == REFRESH_FAST:
+            print('write_yellow_layer skipped (fast mode)')
+        else:
+            print('write_yellow_layer...')
+            t = self._begin()
+            self._command(DATA_START_TRANSMISSION_2)
+            self.write_buffer(buf)
+            self._end(PHASE_YELLOW, t, self._layer_bytes())
         if refresh:
-            print('display refresh ...')
-            self._command(DISPLAY_REFRESH)
-            self.wait_until_idle()
+            self.refresh()
 
     def clear_screen(self):
         print('clear_screen...')
@@ -196,14 +525,15 @@ class EPD:
         print('screen cleared.')
 
     def clear_black_layer(self):
-        self._command(DATA_START_TRANSMISSION_1)
-        for _ in range(0, self.width * self.height // 8):
-            self._data(WHITE)
+        t = self._begin()
+        self._fill_layer(self._black_command())
+        self._end(PHASE_BLACK, t, self._layer_bytes())
 
     def clear_yellow_layer(self):
-        self._command(DATA_START_TRANSMISSION_2)
-        for _ in range(0, self.width * self.height // 8):
-            self._data(WHITE)
+        if self.refresh_mode != REFRESH_FAST:
+            t = self._begin()
+            self._fill_layer(DATA_START_TRANSMISSION_2)
+            self._end(PHASE_YELLOW, t, self._layer_bytes())
 
     def display_frame(self, buf_black, buf_yellow=None):
         print('display_frame...')
@@ -211,13 +541,16 @@ class EPD:
         if buf_black:
             self.write_black_layer(buf_black)
         elif buf_yellow:
-            self.clear_yellow_layer()
+            self.clear_black_layer()
 
         if buf_yellow:
             self.write_yellow_layer(buf_yellow)
         elif buf_black:
-            self.clear_black_layer()
+            self.clear_yellow_layer()
 
-        print('display refresh ...')
-        self._command(DISPLAY_REFRESH)
-        self.wait_until_idle()
+        self.refresh()
+
+    def display_window(self, buf_black, x, y, w, h, buf_yellow=None):
+        """只上传并刷新 (x, y, w, h) 区域，缓冲区仍是整帧大小"""
+        self.set_window(x, y, w, h)
+        self.display_frame(buf_black, buf_yellow)
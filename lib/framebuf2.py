@@ -1,13 +1,56 @@
 # copy from https://github.com/lijiachang/MicroPython-ESP32-e-Paper-Crypto-Display/blob/main/newframebuf.py
 # full version: https://github.com/adafruit/Adafruit_CircuitPython_framebuf/blob/main/adafruit_framebuf.py
 
+import gc
 import os
 import struct
+from array import array
+
+try:
+    from binascii import b2a_base64, crc32
+except ImportError:
+    from ubinascii import b2a_base64, crc32
 
 # Framebuf format constants:
 MHMSB = 1  # Single bit displays like the Sharp Memory
 
 
+# FrameBuffer.print() encodes this many buffer rows per output line.
+DUMP_ROWS = 8
+
+# UnifiedBitmapFont glyph cache sizing: at most 1/GLYPH_CACHE_HEAP_SHARE of the
+# free heap, counting GLYPH_CACHE_ENTRY_OVERHEAD bytes of bookkeeping per entry.
+GLYPH_CACHE_MIN = 30
+GLYPH_CACHE_MAX = 400
+GLYPH_CACHE_HEAP_SHARE = 8
+GLYPH_CACHE_ENTRY_OVERHEAD = 24
+# Scaled/bold glyphs are kept in a separate small cache.
+DERIVED_CACHE_SIZE = 24
+# UnifiedBitmapFont.prefetch() reads this many 6-byte index entries at a time.
+PREFETCH_CHUNK = 64
+# unified_font.bin may end with a bucket table: 257 little-endian uint16 index
+# positions (first entry whose codepoint high byte is >= h, then char_count),
+# followed by this tag.
+FONT_BUCKET_TAG = b"UFB1"
+FONT_BUCKET_SIZE = 257 * 2 + 4
+# Codepoints missing from the font that are remembered to skip repeat lookups.
+NEGATIVE_CACHE_SIZE = 64
+# Unified font magics. Version 1 stores every glyph as a full bitmap. In
+# version 2 an index offset with GLYPH_TRIMMED set points at a GLYPH_HEADER-byte
+# box (top row, row count, first column byte << 4 | bytes per row) followed by
+# only the rows/bytes inside it; other glyphs are stored in full as in v1.
+FONT_MAGIC = 0x5546
+FONT_MAGIC_V2 = 0x5547
+GLYPH_HEADER = 3
+GLYPH_TRIMMED = 0x80000000
+GLYPH_OFFSET_MASK = 0x7FFFFFFF
+# Trimmed glyphs whose box + rows fit in SMALL_GLYPH_SLOT bytes (most ASCII and
+# punctuation) are cached in their own cache of up to SMALL_GLYPH_CACHE_SIZE
+# small slots; everything else is cached as a full bitmap.
+SMALL_GLYPH_SLOT = 16
+SMALL_GLYPH_CACHE_SIZE = 64
+
+
 class FrameBuffer:
     def __init__(self, buf, width, height, buf_format=MHMSB, stride=None):
         # pylint: disable=too-many-arguments
@@ -23,6 +66,66 @@ class FrameBuffer:
         else:
             raise ValueError("invalid format")
         self._rotation = 0
+        self._dirty = None  # 脏矩形 [x0, y0, x1, y1]，缓冲区坐标，含边界
+        self._parent = None  # view() 创建的子视图指向根缓冲区
+        self._ox = self._oy = 0  # 子视图在根缓冲区中的偏移
+
+    def _mark(self, x0, y0, x1, y1):
+        d = self._dirty
+        if d is None:
+            self._dirty = [x0, y0, x1, y1]
+            return
+        if x0 < d[0]:
+            d[0] = x0
+        if y0 < d[1]:
+            d[1] = y0
+        if x1 > d[2]:
+            d[2] = x1
+        if y1 > d[3]:
+            d[3] = y1
+
+    def _mark_parent(self, x0, y0, x1, y1):
+        """子视图的 _mark：换算成根缓冲区坐标后记在根上，父子共享一份脏矩形"""
+        self._parent._mark(x0 + self._ox, y0 + self._oy, x1 + self._ox, y1 + self._oy)
+
+    def view(self, x, y, width, height):
+        """
+        返回共享同一块内存的子帧缓冲：原点在 (x, y)，绘制被裁剪在 width × height 内。
+        通过 memoryview 偏移实现，不复制数据；x 和 width 须为 8 的倍数，视图不带旋转。
+        子视图上的绘制记入根缓冲区的脏矩形，字体对象也与根共用。
+        """
+        # pylint: disable=protected-access
+        if x & 0x07 or width & 0x07 or self.stride & 0x07 or self._rotation:
+            raise ValueError("view needs byte-aligned x/width and an unrotated buffer")
+        if x < 0 or y < 0 or width < 1 or height < 1 or x + width > self.width or y + height > self.height:
+            raise ValueError("view outside of the frame buffer")
+        row = self.stride >> 3
+        start = y * row + (x >> 3)
+        end = start + (height - 1) * row + (width >> 3)  # 截到视图最后一行的末尾，不带出父缓冲区的其余部分
+        view = FrameBuffer(memoryview(self.buf)[start:end], width, height, MHMSB, stride=self.stride)
+        view._parent = self._parent or self
+        view._ox = self._ox + x
+        view._oy = self._oy + y
+        view._mark = view._mark_parent
+        return view
+
+    def dirty_rect(self):
+        """返回自上次 reset_dirty() 以来被绘制过的区域 (x, y, width, height)，没有则返回 None"""
+        d = self._dirty
+        if d is None:
+            return None
+        return d[0], d[1], d[2] - d[0] + 1, d[3] - d[1] + 1
+
+    def reset_dirty(self):
+        """清空脏矩形记录"""
+        self._dirty = None
+
+    def fingerprint(self, y=0, height=None):
+        """缓冲区第 y 行起 height 行的 CRC32 指纹，用于跨唤醒判断画面是否变化"""
+        if height is None:
+            height = self.height - y
+        row = self.stride // 8
+        return crc32(memoryview(self.buf)[y * row:(y + height) * row]) & 0xFFFFFFFF
 
     @property
     def rotation(self):
@@ -33,11 +136,20 @@ class FrameBuffer:
     def rotation(self, val):
         if not val in (0, 1, 2, 3):
             raise RuntimeError("Bad rotation setting")
+        # 旋转只在这里解析一次：把 pixel/rect 换成对应方向的绑定方法，
+        # rotation=0 时直接用类上未做坐标变换的实现
+        if self._rotation:
+            del self.pixel
+            del self.rect
         self._rotation = val
+        if val:
+            self.pixel = getattr(self, "_pixel_%d" % val)
+            self.rect = getattr(self, "_rect_%d" % val)
 
     def fill(self, color):
         """Fill the entire FrameBuffer with the specified color."""
         self.format.fill(self, color)
+        self._mark(0, 0, self.width - 1, self.height - 1)
 
     def fill_rect(self, x, y, width, height, color):
         """Draw a rectangle at the given location, size and color. The ``fill_rect`` method draws
@@ -48,23 +160,23 @@ class FrameBuffer:
     def pixel(self, x, y, color=None):
         """If ``color`` is not given, get the color value of the specified pixel. If ``color`` is
         given, set the specified pixel to the given color."""
-        if self.rotation == 1:
-            x, y = y, x
-            x = self.width - x - 1
-        if self.rotation == 2:
-            x = self.width - x - 1
-            y = self.height - y - 1
-        if self.rotation == 3:
-            x, y = y, x
-            y = self.height - y - 1
-
         if x < 0 or x >= self.width or y < 0 or y >= self.height:
             return None
         if color is None:
             return self.format.get_pixel(self, x, y)
         self.format.set_pixel(self, x, y, color)
+        self._mark(x, y, x, y)
         return None
 
+    def _pixel_1(self, x, y, color=None):
+        return FrameBuffer.pixel(self, self.width - y - 1, x, color)
+
+    def _pixel_2(self, x, y, color=None):
+        return FrameBuffer.pixel(self, self.width - x - 1, self.height - y - 1, color)
+
+    def _pixel_3(self, x, y, color=None):
+        return FrameBuffer.pixel(self, y, self.height - x - 1, color)
+
     def hline(self, x, y, width, color):
         """Draw a horizontal line up to a given length."""
         self.rect(x, y, width, 1, color, fill=True)
@@ -76,45 +188,70 @@ class FrameBuffer:
     def circle(self, center_x, center_y, radius, color):
         """Draw a circle at the given midpoint location, radius and color.
         The ```circle``` method draws only a 1 pixel outline."""
-        x = radius - 1
-        y = 0
-        d_x = 1
-        d_y = 1
-        err = d_x - (radius << 1)
-        while x >= y:
-            self.pixel(center_x + x, center_y + y, color)
-            self.pixel(center_x + y, center_y + x, color)
-            self.pixel(center_x - y, center_y + x, color)
-            self.pixel(center_x - x, center_y + y, color)
-            self.pixel(center_x - x, center_y - y, color)
-            self.pixel(center_x - y, center_y - x, color)
-            self.pixel(center_x + y, center_y - x, color)
-            self.pixel(center_x + x, center_y - y, color)
-            if err <= 0:
-                y += 1
-                err += d_y
-                d_y += 2
-            if err > 0:
-                x -= 1
-                d_x += 2
-                err += d_x - (radius << 1)
+        self._rounded(center_x, center_y, center_x, center_y, radius, color, False)
+
+    def fill_circle(self, center_x, center_y, radius, color):
+        """Draw a filled circle (same outline as ``circle``), one horizontal span per row."""
+        self._rounded(center_x, center_y, center_x, center_y, radius, color, True)
+
+    def round_rect(self, x, y, width, height, radius, color, *, fill=False):
+        """Draw a rectangle with rounded corners; ``radius`` is clamped to half the shorter side."""
+        # pylint: disable=too-many-arguments
+        radius = min(radius, width >> 1, height >> 1)
+        if radius < 2:
+            self.rect(x, y, width, height, color, fill=fill)
+            return
+        left = x + radius - 1
+        top = y + radius - 1
+        right = x + width - radius
+        bottom = y + height - radius
+        self._rounded(left, top, right, bottom, radius, color, fill)
+        if fill:
+            if bottom - top > 1:
+                self.rect(x, top + 1, width, bottom - top - 1, color, fill=True)
+            return
+        self.hline(left, y, right - left + 1, color)
+        self.hline(left, y + height - 1, right - left + 1, color)
+        self.vline(x, top, bottom - top + 1, color)
+        self.vline(x + width - 1, top, bottom - top + 1, color)
+
+    def _rounded(self, left, top, right, bottom, radius, color, fill):
+        """
+        circle/fill_circle/round_rect 的公共部分：四个圆心分别在 (left, top) 等四角的四分之一圆弧。
+        中点圆算法里 x 不变的连续点是一段竖线，对称过来是一段横线，所以按段画而不是逐点画。
+        """
+        # pylint: disable=too-many-arguments, too-many-locals
+        fast = not self._rotation and not self.stride & 0x07
+        span = self._span if fast else self._span_rect
+        for x, y0, y1 in _arc_runs(radius):
+            if fill:
+                for y in range(y0, y1 + 1):
+                    span(left - x, right + x, bottom + y, color)
+                    span(left - x, right + x, top - y, color)
+                span(left - y1, right + y1, bottom + x, color)
+                span(left - y1, right + y1, top - x, color)
+                continue
+            for y in range(y0, y1 + 1):
+                span(right + x, right + x, bottom + y, color)
+                span(left - x, left - x, bottom + y, color)
+                span(right + x, right + x, top - y, color)
+                span(left - x, left - x, top - y, color)
+            span(right + y0, right + y1, bottom + x, color)
+            span(left - y1, left - y0, bottom + x, color)
+            span(right + y0, right + y1, top - x, color)
+            span(left - y1, left - y0, top - x, color)
+        if fast:
+            reach = radius - 1
+            self._mark_clipped(left - reach, top - reach, right + reach, bottom + reach)
+
+    def _span_rect(self, x_0, x_1, y, color):
+        """_span 的通用版本：旋转或未对齐时走 rect（坐标按当前旋转解释）"""
+        self.rect(x_0, y, x_1 - x_0 + 1, 1, color, fill=True)
 
     def rect(self, x, y, width, height, color, *, fill=False):
         """Draw a rectangle at the given location, size and color. The ```rect``` method draws only
         a 1 pixel outline."""
         # pylint: disable=too-many-arguments
-        if self.rotation == 1:
-            x, y = y, x
-            width, height = height, width
-            x = self.width - x - width
-        if self.rotation == 2:
-            x = self.width - x - width
-            y = self.height - y - height
-        if self.rotation == 3:
-            x, y = y, x
-            width, height = height, width
-            y = self.height - y - height
-
         # pylint: disable=too-many-boolean-expressions
         if width < 1 or height < 1 or (x + width) <= 0 or (y + height) <= 0 or y >= self.height or x >= self.width:
             return
@@ -122,6 +259,7 @@ class FrameBuffer:
         y_end = min(self.height - 1, y + height - 1)
         x = max(x, 0)
         y = max(y, 0)
+        self._mark(x, y, x_end, y_end)
         if fill:
             self.format.fill_rect(self, x, y, x_end - x + 1, y_end - y + 1, color)
         else:
@@ -130,40 +268,300 @@ class FrameBuffer:
             self.format.fill_rect(self, x, y_end, x_end - x + 1, 1, color)
             self.format.fill_rect(self, x_end, y, 1, y_end - y + 1, color)
 
-    def line(self, x_0, y_0, x_1, y_1, color):
+    # 旋转后的矩形仍是缓冲区里的一个矩形，换算一次坐标后整块按行填充
+    def _rect_1(self, x, y, width, height, color, *, fill=False):
+        # pylint: disable=too-many-arguments
+        FrameBuffer.rect(self, self.width - y - height, x, height, width, color, fill=fill)
+
+    def _rect_2(self, x, y, width, height, color, *, fill=False):
         # pylint: disable=too-many-arguments
-        """Bresenham's line algorithm"""
+        FrameBuffer.rect(self, self.width - x - width, self.height - y - height, width, height, color, fill=fill)
+
+    def _rect_3(self, x, y, width, height, color, *, fill=False):
+        # pylint: disable=too-many-arguments
+        FrameBuffer.rect(self, y, self.height - x - width, height, width, color, fill=fill)
+
+    def line(self, x_0, y_0, x_1, y_1, color):
+        # pylint: disable=too-many-arguments, too-many-branches
+        """Bresenham's line algorithm
+
+        Integer error terms only. Axis-aligned lines become a single hline/vline
+        and sloped lines are drawn as one span per run of pixels on the same
+        row (shallow) or column (steep).
+        """
+        if y_0 == y_1:
+            self.hline(min(x_0, x_1), y_0, abs(x_1 - x_0) + 1, color)
+            return
+        if x_0 == x_1:
+            self.vline(x_0, min(y_0, y_1), abs(y_1 - y_0) + 1, color)
+            return
+        # 未旋转且按字节对齐时每段直接写缓冲区，整条线最后只记一次脏矩形
+        span = None if self._rotation or self.stride & 0x07 else self._span
         d_x = abs(x_1 - x_0)
         d_y = abs(y_1 - y_0)
         x, y = x_0, y_0
         s_x = -1 if x_0 > x_1 else 1
         s_y = -1 if y_0 > y_1 else 1
         if d_x > d_y:
-            err = d_x / 2.0
-            while x != x_1:
-                self.pixel(x, y, color)
-                err -= d_y
-                if err < 0:
+            err = d_x >> 1
+            start = x
+            while True:
+                last = x == x_1
+                if not last:
+                    err -= d_y
+                if last or err < 0:
+                    lo, hi = (start, x) if start < x else (x, start)
+                    if span:
+                        span(lo, hi, y, color)
+                    else:
+                        self.hline(lo, y, hi - lo + 1, color)
+                    if last:
+                        break
                     y += s_y
                     err += d_x
+                    start = x + s_x
                 x += s_x
         else:
-            err = d_y / 2.0
-            while y != y_1:
-                self.pixel(x, y, color)
-                err -= d_x
-                if err < 0:
+            err = d_y >> 1
+            start = y
+            while True:
+                last = y == y_1
+                if not last:
+                    err -= d_x
+                if last or err < 0:
+                    lo, hi = (start, y) if start < y else (y, start)
+                    if span:
+                        for row in range(lo, hi + 1):
+                            span(x, x, row, color)
+                    else:
+                        self.vline(x, lo, hi - lo + 1, color)
+                    if last:
+                        break
                     x += s_x
                     err += d_y
+                    start = y + s_y
                 y += s_y
-        self.pixel(x, y, color)
+        if span:
+            self._mark_clipped(min(x_0, x_1), min(y_0, y_1), max(x_0, x_1), max(y_0, y_1))
+
+    def _span(self, x_0, x_1, y, color):
+        """未旋转、stride 按字节对齐时的单行填充 [x_0, x_1]（含两端），自行裁剪，不记脏矩形"""
+        if y < 0 or y >= self.height:
+            return
+        if x_0 < 0:
+            x_0 = 0
+        if x_1 >= self.width:
+            x_1 = self.width - 1
+        if x_0 > x_1:
+            return
+        buf = self.buf
+        base = y * (self.stride >> 3)
+        first = base + (x_0 >> 3)
+        last = base + (x_1 >> 3)
+        left = 0xFF >> (x_0 & 0x07)
+        right = (0xFF << (7 - (x_1 & 0x07))) & 0xFF
+        if first == last:
+            left &= right
+        else:
+            buf[last] = buf[last] | right if color else buf[last] & ~right
+            if last - first > 1:
+                buf[first + 1:last] = (b"\xff" if color else b"\x00") * (last - first - 1)
+        buf[first] = buf[first] | left if color else buf[first] & ~left
+
+    def _mark_clipped(self, x_0, y_0, x_1, y_1):
+        """把包围盒裁剪到缓冲区后记入脏矩形"""
+        x_0 = max(x_0, 0)
+        y_0 = max(y_0, 0)
+        x_1 = min(x_1, self.width - 1)
+        y_1 = min(y_1, self.height - 1)
+        if x_0 <= x_1 and y_0 <= y_1:
+            self._mark(x_0, y_0, x_1, y_1)
+
+    def blit(self, source, x, y, key=-1):
+        """Copy a 1-bit image onto the buffer with its top-left corner at (x, y).
+
+        ``source`` is another MHMSB :class:`FrameBuffer` or a :class:`BitmapFile`
+        (PBM/raw bitplane on flash). Rows are fetched one at a time into a
+        single row buffer, so large images never need to fit in RAM.
+        Pixels equal to ``key`` (0 or 1) are transparent; -1 copies everything.
+        """
+        width = source.width
+        height = source.height
+        # 旋转 1/3 时逻辑坐标系的宽高与缓冲区相反
+        frame_width, frame_height = self.width, self.height
+        if self._rotation in (1, 3):
+            frame_width, frame_height = frame_height, frame_width
+        top = -y if y < 0 else 0
+        bottom = min(height, frame_height - y)
+        if top >= bottom or x >= frame_width or x + width <= 0:
+            return
+        row = bytearray((width + 7) >> 3)
+        if key == -1 and not self._rotation and not self.stride & 0x07 and not x & 0x07:
+            for r in range(top, bottom):
+                source.readrow(r, row)
+                self._copy_row(row, x, y + r, width)
+            self._mark(max(x, 0), y + top, min(x + width, self.width) - 1, y + bottom - 1)
+            return
+        inverted = bytearray(len(row)) if key != 0 else None
+        for r in range(top, bottom):
+            source.readrow(r, row)
+            if key != 1:
+                self.blit_glyph(row, x, y + r, width, 1, 1)
+            if inverted is not None:
+                for i, b in enumerate(row):
+                    inverted[i] = ~b & 0xFF
+                self.blit_glyph(inverted, x, y + r, width, 1, 0)
 
-    def blit(self):
-        """blit is not yet implemented"""
-        raise NotImplementedError()
+    def _copy_row(self, row, x, y, width):
+        """blit 的字节对齐路径（x % 8 == 0）：整行切片写入，只有末字节按掩码合并"""
+        first = x >> 3
+        j0 = -first if first < 0 else 0
+        end = min(x + width, self.width)  # 行内最后一个像素之后的位置
+        last = (end - 1) >> 3  # 最后一个被写到的缓冲区字节
+        base = y * (self.stride >> 3)
+        mask = (0xFF << (8 - (end & 0x07))) & 0xFF if end & 0x07 else 0xFF
+        full = last if mask != 0xFF else last + 1
+        if full > first + j0:
+            self.buf[base + first + j0:base + full] = row[j0:full - first]
+        if mask != 0xFF:
+            index = base + last
+            self.buf[index] = (self.buf[index] & ~mask) | (row[last - first] & mask)
+
+    def readrow(self, r, row):
+        """把第 r 行按位打包读进 row（供 blit 把 FrameBuffer 当作源使用）"""
+        n = len(row)
+        if not self.stride & 0x07:
+            start = r * (self.stride >> 3)
+            row[:] = memoryview(self.buf)[start:start + n]
+            return
+        for i in range(n):
+            v = 0
+            for bit in range(8):
+                c = i * 8 + bit
+                if c < self.width and self.format.get_pixel(self, c, r):
+                    v |= 0x80 >> bit
+            row[i] = v
+
+    def blit_glyph(self, data, x, y, width, height, color):
+        """Draw the set bits of a 1-bit glyph packed row by row (MSB on the left,
+        ``(width + 7) // 8`` bytes per row). Clear bits are transparent.
+        字形整体只裁剪一次，每行按字节移位后直接 OR/AND 进缓冲区。"""
+        # pylint: disable=too-many-arguments, too-many-locals
+        if self._rotation or self.stride & 0x07:
+            self._blit_glyph_runs(data, x, y, width, height, color)
+            return
+        top = -y if y < 0 else 0
+        bottom = min(height, self.height - y)
+        if top >= bottom or x >= self.width or x + width <= 0:
+            return
+        src_row = (width + 7) >> 3
+        dst_row = self.stride >> 3
+        shift = x & 0x07
+        first = x >> 3
+        # 输出字节 j 对应缓冲区第 first + j 个字节，超出行范围的字节整体跳过
+        limit = (self.width + 7) >> 3
+        j0 = -first if first < 0 else 0
+        j1 = min(src_row + (1 if shift else 0), limit - first)
+        edge = (0xFF << (8 - (self.width & 0x07))) & 0xFF if self.width & 0x07 else 0
+        # 字形宽度不是 8 的倍数时，屏蔽每行最后一个字节的填充位
+        tail = (0xFF << (8 - (width & 0x07))) & 0xFF if width & 0x07 else 0xFF
+        buf = self.buf
+        for r in range(top, bottom):
+            src = r * src_row
+            dst = (y + r) * dst_row + first
+            for j in range(j0, j1):
+                hi = 0
+                if j:
+                    hi = data[src + j - 1] & tail if j == src_row else data[src + j - 1]
+                lo = 0
+                if j < src_row:
+                    lo = data[src + j] & tail if j == src_row - 1 else data[src + j]
+                v = (((hi << 8) | lo) >> shift) & 0xFF
+                if not v:
+                    continue
+                if edge and first + j == limit - 1:
+                    v &= edge
+                if color:
+                    buf[dst + j] |= v
+                else:
+                    buf[dst + j] &= ~v
+        self._mark(max(x, 0), y + top, min(x + width, self.width) - 1, y + bottom - 1)
+
+    def _blit_glyph_runs(self, data, x, y, width, height, color):
+        """
+        blit_glyph 的通用路径：连续的置位像素合并成一次 rect 调用（处理旋转）。
+        rotation=1/3 时字形的列对应缓冲区的行，所以按列找竖直游程，落到缓冲区是横向整段填充。
+        """
+        # pylint: disable=too-many-arguments
+        src_row = (width + 7) >> 3
+        if self._rotation & 1:
+            for c in range(width):
+                src = c >> 3
+                bit = 0x80 >> (c & 0x07)
+                r = 0
+                while r < height:
+                    if data[r * src_row + src] & bit:
+                        start = r
+                        r += 1
+                        while r < height and data[r * src_row + src] & bit:
+                            r += 1
+                        self.rect(x + c, y + start, 1, r - start, color, fill=True)
+                    else:
+                        r += 1
+            return
+        for r in range(height):
+            src = r * src_row
+            c = 0
+            while c < width:
+                if data[src + (c >> 3)] & (0x80 >> (c & 0x07)):
+                    start = c
+                    c += 1
+                    while c < width and data[src + (c >> 3)] & (0x80 >> (c & 0x07)):
+                        c += 1
+                    self.rect(x + start, y + r, c - start, 1, color, fill=True)
+                else:
+                    c += 1
 
     def scroll(self, delta_x, delta_y):
-        """shifts framebuf in x and y direction"""
+        """shifts framebuf in x and y direction
+
+        Pixels scrolled out are lost and the vacated area keeps its old content.
+        整行搬移用切片完成，水平移动把一行当作大整数整体移位，再按掩码写回。
+        """
+        if abs(delta_x) >= self.width or abs(delta_y) >= self.height or not (delta_x or delta_y):
+            return
+        if self.stride & 0x07:
+            self._scroll_pixels(delta_x, delta_y)
+            return
+        row = self.stride >> 3
+        n = (self.width + 7) >> 3  # 一行中实际用到的字节数
+        x0 = max(delta_x, 0)
+        x1 = self.width + min(delta_x, 0)
+        y0 = max(delta_y, 0)
+        y1 = self.height + min(delta_y, 0)
+        # 向下滚动时从底部开始搬，保证源行在被覆盖前已读出
+        rows = range(y1 - 1, y0 - 1, -1) if delta_y > 0 else range(y0, y1)
+        buf = self.buf
+        mv = memoryview(buf)
+        if not delta_x and not self.width & 0x07:
+            for y in rows:
+                dst = y * row
+                src = (y - delta_y) * row
+                buf[dst:dst + n] = mv[src:src + n]
+        else:
+            bits = n * 8
+            mask = ((1 << (x1 - x0)) - 1) << (bits - x1)
+            for y in rows:
+                dst = y * row
+                src = (y - delta_y) * row
+                v = int.from_bytes(bytes(mv[src:src + n]), "big")
+                v = v >> delta_x if delta_x > 0 else v << -delta_x
+                old = int.from_bytes(bytes(mv[dst:dst + n]), "big")
+                buf[dst:dst + n] = ((old & ~mask) | (v & mask)).to_bytes(n, "big")
+        self._mark(x0, y0, x1 - 1, y1 - 1)
+
+    def _scroll_pixels(self, delta_x, delta_y):
+        """scroll 的逐像素路径，用于 stride 不是 8 的倍数的缓冲区"""
         if delta_x < 0:
             shift_x = 0
             xend = self.width + delta_x
@@ -186,12 +584,10 @@ class FrameBuffer:
                 self.format.set_pixel(self, x, y, self.format.get_pixel(self, x - delta_x, y - delta_y))
                 x += dt_x
             y += dt_y
+        self._mark(0, 0, self.width - 1, self.height - 1)
 
-    # pylint: disable=too-many-arguments
-    def text(self, string, x, y, color, *, font_name="font5x8.bin", size=1, spacing=0):
-        """Place text on the screen in variables sizes. Breaks on \n to next line.
-        Does not break on line going off screen.
-        """
+    def _text_font(self, font_name):
+        """返回 text() 使用的字体对象和是否为统一字体；子视图与根缓冲区共用一个字体对象（及其缓存）"""
         try:
             from config import ENABLE_UNIFIED_FONT, UNIFIED_FONT_FILE
             use_unified = ENABLE_UNIFIED_FONT
@@ -199,33 +595,57 @@ class FrameBuffer:
         except ImportError:
             use_unified = False
             unified_font_file = "unified_font.bin"
-        
+        owner = self._parent or self
+        if use_unified:
+            if not owner._font or not isinstance(owner._font, UnifiedBitmapFont):
+                try:
+                    from config import GLYPH_CACHE_SIZE
+                except ImportError:
+                    GLYPH_CACHE_SIZE = None
+                try:
+                    from config import GLYPH_PACK_FILE
+                except ImportError:
+                    GLYPH_PACK_FILE = None
+                owner._font = UnifiedBitmapFont(unified_font_file, cache_size=GLYPH_CACHE_SIZE,
+                                                pack_name=GLYPH_PACK_FILE)
+        elif not owner._font or owner._font.font_name != font_name:
+            owner._font = BitmapFont(font_name)
+        return owner._font, use_unified
+
+    def prefetch(self, string, font_name="font5x8.bin"):
+        """预先把 string 中用到的字形批量读进字体缓存（仅统一字体支持，其余字体忽略）"""
+        font, use_unified = self._text_font(font_name)
+        if use_unified:
+            font.prefetch(string)
+
+    # pylint: disable=too-many-arguments
+    def text(self, string, x, y, color, *, font_name="font5x8.bin", size=1, spacing=0, bold=False):
+        """Place text on the screen in variables sizes. Breaks on \n to next line.
+        Does not break on line going off screen.
+        bold=True 时每个字形行取 row | (row >> 1) 后只绘制一次（加宽 1 像素），
+        效果等同于在 x 和 x+1 各画一遍。
+        """
+        font, use_unified = self._text_font(font_name)
+        width = font.font_width
+        height = font.font_height
         frame_width = self.width
         frame_height = self.height
         if self.rotation in (1, 3):
             frame_width, frame_height = frame_height, frame_width
 
         for chunk in string.split("\n"):
-            if use_unified:
-                if not self._font or not isinstance(self._font, UnifiedBitmapFont):
-                    self._font = UnifiedBitmapFont(unified_font_file)
-                width = self._font.font_width
-                height = self._font.font_height
-            else:
-                if not self._font or self._font.font_name != font_name:
-                    self._font = BitmapFont(font_name)
-                width = self._font.font_width
-                height = self._font.font_height
-            
+            # 整行在裁剪区上方或下方时直接跳过，不逐字查字形
+            if y >= frame_height:
+                break
+            if y + height * size <= 0:
+                y += height * size
+                continue
             cursor_x = x
             for char in chunk:
-                if (
-                    cursor_x + (width * size) > 0
-                    and cursor_x < frame_width
-                    and y + (height * size) > 0
-                    and y < frame_height
-                ):
-                    self._font.draw_char(char, cursor_x, y, self, color, size=size)
+                if cursor_x >= frame_width and spacing >= 0:
+                    break  # 其余字符都在右边界之外
+                if cursor_x + (width * size) + bold > 0 and cursor_x < frame_width:
+                    font.draw_char(char, cursor_x, y, self, color, size=size, bold=bold)
                 
                 # 双步进逻辑：ASCII 半角 (8px)，中文 全角 (16px)
                 # 增加对 ° (176) 的特殊处理，使其按半角步进，紧贴后面的 C
@@ -239,7 +659,8 @@ class FrameBuffer:
 
     def image(self, img):
         """Set buffer to value of Python Imaging Library image.  The image should
-        be in 1 bit mode and a size equal to the display size."""
+        be in 1 bit mode and a size equal to the display size.
+        主机侧整行写入的快速路径见 tools/framebuf_host.image()。"""
         # determine our effective width/height, taking rotation into account
         width = self.width
         height = self.height
@@ -251,9 +672,12 @@ class FrameBuffer:
             raise ValueError("Image must be same dimensions as display ({0}x{1}).".format(width, height))
         # Grab all the pixels from the image, faster than getpixel.
         pixels = img.load()
-        # Clear buffer
-        for i in range(len(self.buf)):  # pylint: disable=consider-using-enumerate
-            self.buf[i] = 0
+        # Clear buffer（逐行清，子视图只清自己的行，不碰行间属于父缓冲区的字节）
+        n = (self.width + 7) >> 3
+        row = (self.stride + 7) >> 3
+        for y in range(self.height):
+            for i in range(y * row, y * row + n):
+                self.buf[i] = 0
         # Iterate through the pixels
         for x in range(width):  # yes this double loop is slow,
             for y in range(height):  #  but these displays are small!
@@ -261,30 +685,142 @@ class FrameBuffer:
                     self.pixel(x, y, pixels[(x, y)])
                 elif pixels[(x, y)]:
                     self.pixel(x, y, 1)  # only write if pixel is true
+        self._mark(0, 0, self.width - 1, self.height - 1)
 
     def print(self):
-        print("." * (self.width + 2))
-        for y in range(self.height):
-            print(".", end="")
-            prev = '*'
-            n = 0
-            for x in range(self.width):
-                if self.pixel(x, y):
-                    if prev != '*':
-                        print(f'{n}*', end='')
-                        n = 0
-                        prev = '*'
-                    n += 1
-                    # print("*", end="")
-                else:
-                    if prev != ' ':
-                        print(f'{n} ', end='')
-                        n = 0
-                        prev = ' '
-                    n += 1
-                    # print(" ", end="")
-            print(".")
-        print("." * (self.width + 2))
+        """Dump the buffer over the serial REPL as PackBits RLE + base64.
+
+        输出格式：``FRAMEBUF <width> <height> <stride>`` 一行，随后每 DUMP_ROWS 行
+        缓冲区编码成一行 base64，最后一行 ``END FRAMEBUF``。主机侧用
+        tools/fb_dump.py 还原成 PBM/PNG。按行段编码，不需要整帧大小的临时内存。
+        行宽小于 stride 时（如子视图）只输出每行自己的字节，头部的 stride 记为打包后的行宽。
+        """
+        mv = memoryview(self.buf)
+        n = (self.width + 7) >> 3
+        row = self.stride >> 3
+        if self.stride & 0x07 or n == row:
+            step = (self.stride * DUMP_ROWS + 7) >> 3
+            print("FRAMEBUF %d %d %d" % (self.width, self.height, self.stride))
+            for start in range(0, len(self.buf), step):
+                print(b2a_base64(rle_encode(mv[start:start + step])).decode().strip())
+        else:
+            print("FRAMEBUF %d %d %d" % (self.width, self.height, n << 3))
+            for y0 in range(0, self.height, DUMP_ROWS):
+                rows = b"".join(mv[y * row:y * row + n] for y in range(y0, min(y0 + DUMP_ROWS, self.height)))
+                print(b2a_base64(rle_encode(rows)).decode().strip())
+        print("END FRAMEBUF")
+
+    def save_pbm(self, file):
+        """
+        把缓冲区（未旋转的原始方向）写成二进制 PBM（P4）。file 为路径或可写的二进制文件。
+        PBM 以 1 表示黑色，与缓冲区相反，所以逐行整数异或取反后写出。
+        """
+        if self.stride & 0x07:
+            raise ValueError("save_pbm needs a byte-aligned stride")
+        own = isinstance(file, str)
+        f = open(file, "wb") if own else file
+        try:
+            f.write(("P4\n%d %d\n" % (self.width, self.height)).encode())
+            n = (self.width + 7) >> 3
+            row = self.stride >> 3
+            ones = (1 << (n * 8)) - 1
+            mv = memoryview(self.buf)
+            for y in range(self.height):
+                v = int.from_bytes(bytes(mv[y * row:y * row + n]), "big")
+                f.write((v ^ ones).to_bytes(n, "big"))
+        finally:
+            if own:
+                f.close()
+
+
+def rle_encode(data):
+    """
+    PackBits 编码：0..127 表示其后 n+1 个字节原样，129..255 表示下一个字节重复 257-n 次。
+    电子墨水屏画面大多是整片白色，通常能压到原来的几分之一。
+    """
+    out = bytearray()
+    n = len(data)
+    i = 0
+    while i < n:
+        b = data[i]
+        j = i + 1
+        while j < n and j - i < 128 and data[j] == b:
+            j += 1
+        if j - i > 1:
+            out.append(257 - (j - i))
+            out.append(b)
+            i = j
+            continue
+        # 原样段：直到出现至少 3 个相同字节的重复段为止
+        while j < n and j - i < 128 and not (j + 2 < n and data[j] == data[j + 1] == data[j + 2]):
+            j += 1
+        out.append(j - i - 1)
+        out += data[i:j]
+        i = j
+    return out
+
+
+class BitmapFile:
+    """A 1-bit image stored on flash, read one packed row at a time for
+    :meth:`FrameBuffer.blit`.
+
+    Without ``width``/``height`` the file is parsed as a binary PBM (``P4``);
+    PBM uses 1 for black, so rows are inverted to match the buffer, where
+    0 is black. Otherwise it is a raw bitplane of ``(width + 7) // 8`` bytes
+    per row starting at ``offset``.
+    """
+
+    def __init__(self, file, width=None, height=None, offset=0, invert=False):
+        # pylint: disable=too-many-arguments
+        self._own = isinstance(file, str)
+        self._f = open(file, "rb") if self._own else file
+        if width is None:
+            self._f.seek(offset)
+            if self._token() != b"P4":
+                raise ValueError("not a binary PBM (P4) file")
+            width = int(self._token())
+            height = int(self._token())
+            offset = self._f.tell()
+            invert = not invert
+        self.width = width
+        self.height = height
+        self.offset = offset
+        self.invert = invert
+        self.row_bytes = (width + 7) >> 3
+
+    def _token(self):
+        """读取 PBM 头中的下一个字段（跳过空白和 # 注释），并吃掉其后的一个空白字节"""
+        token = b""
+        while True:
+            c = self._f.read(1)
+            if not c:
+                return token
+            if c == b"#":
+                while c not in (b"\n", b""):
+                    c = self._f.read(1)
+            elif c in b" \t\r\n":
+                if token:
+                    return token
+            else:
+                token += c
+
+    def readrow(self, r, row):
+        """把第 r 行读进 row（长度为 row_bytes 的 bytearray）"""
+        self._f.seek(self.offset + r * self.row_bytes)
+        self._f.readinto(row)
+        if self.invert:
+            for i, b in enumerate(row):
+                row[i] = ~b & 0xFF
+
+    def close(self):
+        if self._own:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
 
 class MHMSBFormat:
@@ -307,23 +843,158 @@ class MHMSBFormat:
     @staticmethod
     def fill(framebuf: FrameBuffer, color):
         """completely fill/clear the buffer with a color"""
-        if color:
-            fill = 0xFF
-        else:
-            fill = 0x00
-        for i in range(len(framebuf.buf)):  # pylint: disable=consider-using-enumerate
-            framebuf.buf[i] = fill
+        MHMSBFormat.fill_rect(framebuf, 0, 0, framebuf.width, framebuf.height, color)
 
     @staticmethod
     def fill_rect(framebuf: FrameBuffer, x, y, width, height, color):
         """Draw a rectangle at the given location, size and color. The ``fill_rect`` method draws
         both the outline and interior."""
         # pylint: disable=too-many-arguments
-        for _x in range(x, x + width):
-            offset = 7 - _x & 0x07
-            for _y in range(y, y + height):
-                index = (_y * framebuf.stride + _x) // 8
-                framebuf.buf[index] = (framebuf.buf[index] & ~(0x01 << offset)) | ((color != 0) << offset)
+        buf = framebuf.buf
+        if framebuf.stride & 0x07:
+            # 行首不在字节边界上，只能逐像素读改写
+            for _x in range(x, x + width):
+                offset = 7 - _x & 0x07
+                for _y in range(y, y + height):
+                    index = (_y * framebuf.stride + _x) // 8
+                    buf[index] = (buf[index] & ~(0x01 << offset)) | ((color != 0) << offset)
+            return
+
+        # 按行处理：首尾不完整的字节用掩码读改写，中间整字节用切片赋值
+        row = framebuf.stride >> 3
+        fill = 0xFF if color else 0x00
+        first = x >> 3
+        last = (x + width - 1) >> 3
+        left_mask = 0xFF >> (x & 0x07)
+        right_mask = (0xFF << (7 - ((x + width - 1) & 0x07))) & 0xFF
+        if first == last:
+            mask = left_mask & right_mask
+            bits = fill & mask
+            for index in range(y * row + first, (y + height) * row, row):
+                buf[index] = (buf[index] & ~mask) | bits
+            return
+
+        if left_mask == 0xFF:
+            first -= 1  # 首字节完整，并入中间段
+        if right_mask == 0xFF:
+            last += 1
+        middle = bytes([fill]) * (last - first - 1)
+        left_bits = fill & left_mask
+        right_bits = fill & right_mask
+        for base in range(y * row, (y + height) * row, row):
+            if left_mask != 0xFF:
+                index = base + first
+                buf[index] = (buf[index] & ~left_mask) | left_bits
+            if middle:
+                buf[base + first + 1:base + last] = middle
+            if right_mask != 0xFF:
+                index = base + last
+                buf[index] = (buf[index] & ~right_mask) | right_bits
+
+
+def _arc_runs(radius):
+    """
+    中点圆算法（与 FrameBuffer.circle 原先的逐点版本一致）的第一个八分圆，
+    按 x 分组返回 [x, y_first, y_last] 段列表
+    """
+    runs = []
+    x = radius - 1
+    y = 0
+    d_x = 1
+    d_y = 1
+    err = d_x - (radius << 1)
+    while x >= y:
+        if runs and runs[-1][0] == x:
+            runs[-1][2] = y
+        else:
+            runs.append([x, y, y])
+        if err <= 0:
+            y += 1
+            err += d_y
+            d_y += 2
+        if err > 0:
+            x -= 1
+            d_x += 2
+            err += d_x - (radius << 1)
+    return runs
+
+
+_SCALE_TABLES = {}
+
+
+def scale_table(scale):
+    """Return the bit-replication table for ``scale``.
+
+    Entry ``b`` is ``scale`` bytes long and holds every bit of ``b`` repeated
+    ``scale`` times, MSB first; for ``scale == 2`` this is the classic
+    nibble-to-byte doubling table. Tables are built on first use and cached.
+    """
+    table = _SCALE_TABLES.get(scale)
+    if table is None:
+        table = bytearray(256 * scale)
+        ones = (1 << scale) - 1
+        for b in range(256):
+            v = 0
+            for bit in range(8):
+                v <<= scale
+                if b & (0x80 >> bit):
+                    v |= ones
+            for k in range(scale):
+                table[b * scale + k] = (v >> (8 * (scale - 1 - k))) & 0xFF
+        table = _SCALE_TABLES[scale] = bytes(table)
+    return table
+
+
+def scale_bits(data, width, height, scale):
+    """Scale a row-packed 1-bit bitmap by ``scale``; returns ``(data, width, height)``.
+
+    Each source byte becomes ``scale`` whole bytes via :func:`scale_table` and
+    each row is repeated ``scale`` times. The returned width is rounded up to
+    whole bytes; padding bits are cleared.
+    """
+    src_row = (width + 7) >> 3
+    dst_row = src_row * scale
+    tail = (0xFF << (8 - (width & 0x07))) & 0xFF if width & 0x07 else 0xFF
+    table = memoryview(scale_table(scale))
+    out = bytearray(dst_row * height * scale)
+    pos = 0
+    for row in range(height):
+        start = pos
+        for j in range(src_row):
+            b = data[row * src_row + j]
+            if j == src_row - 1:
+                b &= tail
+            out[pos:pos + scale] = table[b * scale:(b + 1) * scale]
+            pos += scale
+        for _ in range(scale - 1):
+            out[pos:pos + dst_row] = out[start:start + dst_row]
+            pos += dst_row
+    return out, dst_row * 8, height * scale
+
+
+def embolden_bits(data, width, height):
+    """Synthetic bold for a row-packed 1-bit bitmap; returns ``(data, width + 1, height)``.
+
+    Every row becomes ``row | (row >> 1)``, which is the same as drawing the
+    bitmap twice one pixel apart, so the result is one pixel wider.
+    """
+    src_row = (width + 7) >> 3
+    dst_row = (width + 8) >> 3
+    tail = (0xFF << (8 - (width & 0x07))) & 0xFF if width & 0x07 else 0xFF
+    out = bytearray(dst_row * height)
+    for row in range(height):
+        src = row * src_row
+        dst = row * dst_row
+        carry = 0
+        for j in range(src_row):
+            b = data[src + j]
+            if j == src_row - 1:
+                b &= tail
+            out[dst + j] = b | (b >> 1) | carry
+            carry = (b & 0x01) << 7
+        if dst_row > src_row:
+            out[dst + src_row] = carry
+    return out, width + 1, height
 
 
 # MicroPython basic bitmap font renderer.
@@ -376,13 +1047,15 @@ class BitmapFont:
         """cleanup on exit"""
         self.deinit()
 
-    def draw_char(self, char, x, y, framebuffer, color, size=1):  # pylint: disable=too-many-arguments
+    def draw_char(self, char, x, y, framebuffer, color, size=1, bold=False):  # pylint: disable=too-many-arguments
         """Draw one character at position (x,y) to a framebuffer in a given color"""
         size = max(size, 1)
         # Don't draw the character if it will be clipped off the visible area.
         # if x < -self.font_width or x >= framebuffer.width or \
         #   y < -self.font_height or y >= framebuffer.height:
         #    return
+        # Fake bold: every set pixel is drawn one pixel wider, so it also covers the pixel to its right.
+        dot_width = size + 1 if bold else size
         # Go through each column of the character.
         for char_x in range(self.font_width):
             # Grab the byte for the current column of font data.
@@ -395,119 +1068,509 @@ class BitmapFont:
             for char_y in range(self.font_height):
                 # Draw a pixel for each bit that's flipped on.
                 if (line >> char_y) & 0x1:
-                    framebuffer.fill_rect(x + char_x * size, y + char_y * size, size, size, color)
+                    framebuffer.fill_rect(x + char_x * size, y + char_y * size, dot_width, size, color)
 
     def width(self, text):
         """Return the pixel width of the specified text message."""
         return len(text) * (self.font_width + 1)
 
 
+class GlyphCache:
+    """
+    O(1) LRU 缓存。最近使用顺序用两个 array 实现的双向链表维护，命中和淘汰都不用搜索列表。
+    slot_size > 0 时所有条目存放在一块预先分配的 bytearray 里（每个槽 slot_size 字节），
+    get/put 返回指向槽的 memoryview —— 下一次 put 可能覆盖它，拿到后应立即使用；
+    slot_size 为 0 时条目是任意 Python 对象（用于放大/加粗后尺寸不一的派生字形）。
+    """
+
+    def __init__(self, capacity, slot_size=0):
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self._slab = memoryview(bytearray(capacity * slot_size)) if slot_size else None
+        self._values = None if slot_size else [None] * capacity
+        self._keys = [None] * capacity
+        self._index = {}
+        # 下标 capacity 是哨兵：_next[哨兵] 为最近使用，_prev[哨兵] 为最久未用
+        self._prev = array("h", [capacity] * (capacity + 1))
+        self._next = array("h", [capacity] * (capacity + 1))
+        self._used = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def _unlink(self, slot):
+        prev = self._prev[slot]
+        nxt = self._next[slot]
+        self._next[prev] = nxt
+        self._prev[nxt] = prev
+
+    def _push_front(self, slot):
+        head = self.capacity
+        first = self._next[head]
+        self._prev[slot] = head
+        self._next[slot] = first
+        self._prev[first] = slot
+        self._next[head] = slot
+
+    def _value(self, slot):
+        if self._values is not None:
+            return self._values[slot]
+        start = slot * self.slot_size
+        return self._slab[start:start + self.slot_size]
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return self._used
+
+    def get(self, key):
+        """命中时把条目移到最前并返回，否则返回 None"""
+        slot = self._index.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self._next[self.capacity] != slot:
+            self._unlink(slot)
+            self._push_front(slot)
+        return self._value(slot)
+
+    def put(self, key, value):
+        """放入条目（满时淘汰最久未用的），返回缓存中的值"""
+        if not self.capacity:
+            return value
+        if self._used < self.capacity:
+            slot = self._used
+            self._used += 1
+        else:
+            slot = self._prev[self.capacity]
+            self._unlink(slot)
+            del self._index[self._keys[slot]]
+            self.evictions += 1
+        self._keys[slot] = key
+        self._index[key] = slot
+        self._push_front(slot)
+        if self._values is not None:
+            self._values[slot] = value
+        else:
+            start = slot * self.slot_size
+            self._slab[start:start + len(value)] = value
+        return self._value(slot)
+
+    def clear(self):
+        """清空条目（保留已分配的内存和统计数）"""
+        self._index = {}
+        self._keys = [None] * self.capacity
+        if self._values is not None:
+            self._values = [None] * self.capacity
+        head = self.capacity
+        self._prev[head] = self._next[head] = head
+        self._used = 0
+
+    def stats(self):
+        """返回 (容量, 已用, 命中, 未命中, 淘汰)"""
+        return self.capacity, self._used, self.hits, self.misses, self.evictions
+
+
+def glyph_cache_capacity(slot_size):
+    """按当前空闲堆内存估算字形缓存条目数（主机侧没有 gc.mem_free 时取上限）"""
+    try:
+        gc.collect()
+        free = gc.mem_free()
+    except AttributeError:
+        return GLYPH_CACHE_MAX
+    n = free // GLYPH_CACHE_HEAP_SHARE // (slot_size + GLYPH_CACHE_ENTRY_OVERHEAD)
+    return max(GLYPH_CACHE_MIN, min(GLYPH_CACHE_MAX, n))
+
+
 class UnifiedBitmapFont:
     """
     统一字体类，支持 ASCII + 中文的 16×16 位图字体
     使用按需加载和 LRU 缓存机制
     """
     
-    def __init__(self, font_name="unified_font.bin", cache_size=30):
+    def __init__(self, font_name="unified_font.bin", cache_size=None, pack_name=None):
+        """
+        cache_size 为 None 时按空闲堆内存自动确定字形缓存条目数。
+        pack_name：可选的字形包（tools/subset_font.py 按当前内容生成的同格式小字体），
+        查字时先查字形包，没有再查完整字体；文件不存在或无效时忽略。
+        """
         self.font_name = font_name
         self.cache_size = cache_size
         self.font_width = 16
         self.font_height = 16
-        self._cache = {}
-        self._cache_order = []
+        self._cache = None
+        self._derived = GlyphCache(DERIVED_CACHE_SIZE)
         self.char_count = 0
         self.index_offset = 8
         self._f = None
         
         try:
             self._f = open(self.font_name, "rb")
-            magic = struct.unpack('<H', self._f.read(2))[0]
-            if magic != 0x5546:
+            header = self._f.read(8)
+            if len(header) < 8:
                 raise RuntimeError("Invalid unified font file")
-            
-            self.font_width = struct.unpack('<H', self._f.read(2))[0]
-            self.font_height = struct.unpack('<H', self._f.read(2))[0]
-            self.char_count = struct.unpack('<H', self._f.read(2))[0]
-        except OSError:
-            print(f"Could not find font file {font_name}")
+            magic, self.font_width, self.font_height, self.char_count = struct.unpack('<4H', header)
+            if magic not in (FONT_MAGIC, FONT_MAGIC_V2):
+                raise RuntimeError("Invalid unified font file")
+            self.version = 2 if magic == FONT_MAGIC_V2 else 1
+        except Exception as e:
+            if isinstance(e, OSError):
+                print(f"Could not find font file {font_name}")
             if self._f: self._f.close()
+            self._f = None
             raise
-    
-    def _find_char_offset(self, char_code):
-        """使用二分查找在文件中查找字符偏移量"""
-        if not self._f: return None
+        self.glyph_bytes = ((self.font_width + 7) >> 3) * self.font_height
+        # 两级缓存：裁剪后放得进 SMALL_GLYPH_SLOT 的字形（边框 + 行）进 _small，
+        # 其余字形展开成完整位图进 _cache；自动确定容量时 _small 的内存从同一份预算中扣除
+        small = min(SMALL_GLYPH_CACHE_SIZE, self.cache_size if self.cache_size is not None else SMALL_GLYPH_CACHE_SIZE)
+        if self.cache_size is None:
+            total = glyph_cache_capacity(self.glyph_bytes)
+            small = min(small, total // 2)
+            used = small * (SMALL_GLYPH_SLOT + GLYPH_CACHE_ENTRY_OVERHEAD)
+            self.cache_size = total - used // (self.glyph_bytes + GLYPH_CACHE_ENTRY_OVERHEAD)
+        self._cache = GlyphCache(self.cache_size, self.glyph_bytes)
+        self._small = GlyphCache(small, SMALL_GLYPH_SLOT)
+        self._box = memoryview(bytearray(GLYPH_HEADER + self.glyph_bytes))  # 读取缓冲
+        self._full = bytearray(self.glyph_bytes)  # 展开裁剪过的字形用
+        self._scan = bytearray(PREFETCH_CHUNK * 6)  # 索引读取缓冲，查找和预读共用
+        self._missing = set()  # 负缓存：字库中没有的编码
+        self._buckets = self._load_buckets()
+        self._pack = None
+        if pack_name:
+            self._pack = self._open_pack(pack_name)
+
+    def _open_pack(self, pack_name):
+        """打开字形包；不存在是常态，直接返回 None；损坏或尺寸不符时提示一次并忽略"""
         try:
-            left = 0
-            right = self.char_count - 1
-            
-            while left <= right:
-                mid = (left + right) // 2
-                self._f.seek(self.index_offset + mid * 6)
-                
-                unicode_val = struct.unpack('<H', self._f.read(2))[0]
-                
-                if unicode_val == char_code:
-                    offset = struct.unpack('<I', self._f.read(4))[0]
-                    return offset
-                elif unicode_val < char_code:
-                    left = mid + 1
-                else:
-                    right = mid - 1
-            
+            os.stat(pack_name)
+        except OSError:
             return None
+        try:
+            pack = UnifiedBitmapFont(pack_name, cache_size=0)
+        except Exception as e:
+            print(f"Ignoring glyph pack {pack_name}: {e}")
+            return None
+        if (pack.font_width, pack.font_height) != (self.font_width, self.font_height):
+            print(f"Ignoring glyph pack {pack_name}: size mismatch")
+            pack.deinit()
+            return None
+        return pack
+
+    def _load_buckets(self):
+        """
+        读取文件末尾的分桶表（按编码高字节划分的索引区间，约 0.5KB 常驻内存）；
+        旧字体文件没有该表时顺序扫描一遍索引现场生成
+        """
+        f = self._f
+        try:
+            f.seek(-FONT_BUCKET_SIZE, 2)
+            trailer = f.read(FONT_BUCKET_SIZE)
+        except OSError:
+            trailer = b""
+        if len(trailer) == FONT_BUCKET_SIZE and trailer[-4:] == FONT_BUCKET_TAG:
+            return array("H", struct.unpack("<257H", trailer[:-4]))
+        return self._scan_buckets()
+
+    def _scan_buckets(self):
+        """按块顺序读索引生成分桶表；块内高字节不变时跳过逐条比较"""
+        buckets = array("H", [self.char_count] * 257)
+        chunk = self._scan
+        h = 0  # 下一个待确定起点的高字节
+        for start in range(0, self.char_count, PREFETCH_CHUNK):
+            n = min(PREFETCH_CHUNK, self.char_count - start)
+            self._f.seek(self.index_offset + start * 6)
+            self._f.readinto(chunk)
+            if struct.unpack_from("<H", chunk, (n - 1) * 6)[0] >> 8 < h:
+                continue
+            for i in range(n):
+                high = struct.unpack_from("<H", chunk, i * 6)[0] >> 8
+                while h <= high:
+                    buckets[h] = start + i
+                    h += 1
+        return buckets
+
+    def _candidates(self, char_code):
+        """
+        返回 char_code 在索引中可能所在的下标区间 [lo, hi)。桶内编码低字节严格递增，
+        所以第 k 条的低字节在 [k, k + 256 - 桶大小] 之间，满桶时区间只有一条
+        """
+        high = char_code >> 8
+        start = self._buckets[high]
+        size = self._buckets[high + 1] - start
+        if not size:
+            return start, start
+        low = char_code & 0xFF
+        return start + max(0, low - (256 - size)), start + min(low, size - 1) + 1
+
+    def _find_char_offset(self, char_code):
+        """
+        查找字符的索引项（位图的文件偏移，v2 中可能带 GLYPH_TRIMMED 标记）：
+        分桶表把范围缩小到几条（满桶时一条）索引，
+        用 readinto 按条数读入后在内存中比较；找不到的编码记入负缓存
+        """
+        if not self._f or char_code in self._missing:
+            return None
+        if char_code > 0xFFFF:
+            return self._remember_missing(char_code)
+        lo, hi = self._candidates(char_code)
+        chunk = self._scan
+        mv = memoryview(chunk)
+        try:
+            while lo < hi:
+                n = min(hi - lo, PREFETCH_CHUNK)
+                self._f.seek(self.index_offset + lo * 6)
+                self._f.readinto(mv[:n * 6])  # 只读候选的几条索引，不读满整个缓冲区
+                for i in range(n):
+                    key, offset = struct.unpack_from("<HI", chunk, i * 6)
+                    if key == char_code:
+                        return offset
+                    if key > char_code:
+                        return self._remember_missing(char_code)
+                lo += n
+            return self._remember_missing(char_code)
         except Exception as e:
             print(f"Error finding char {char_code}: {e}")
             return None
-    
-    def _load_char(self, char_code):
-        """从文件加载字符位图"""
-        if char_code in self._cache:
-            self._cache_order.remove(char_code)
-            self._cache_order.append(char_code)
-            return self._cache[char_code]
-        
-        offset = self._find_char_offset(char_code)
-        if offset is None:
+
+    def _remember_missing(self, char_code):
+        if len(self._missing) >= NEGATIVE_CACHE_SIZE:
+            self._missing.clear()
+        self._missing.add(char_code)
+        return None
+
+    def _index_key(self, i):
+        self._f.seek(self.index_offset + i * 6)
+        return struct.unpack('<H', self._f.read(2))[0]
+
+    def _chunk_start(self, char_code, lo):
+        """
+        已知下标 lo 之前的编码都 < char_code：用分桶表得到候选区间，
+        必要时再二分收窄到不超过一块，返回该块起点（char_code 若存在必在其中）
+        """
+        first, hi = self._candidates(char_code)
+        if first >= hi:
+            return max(lo, hi)  # 高字节对应的桶为空
+        lo = max(lo, first)
+        while hi - lo > PREFETCH_CHUNK:
+            mid = (lo + hi) >> 1
+            if self._index_key(mid) < char_code:
+                lo = mid + 1
+            else:
+                hi = mid + 1
+        return lo
+
+    def prefetch(self, text):
+        """
+        批量预读 text 中尚未缓存的字形：
+        1. 去重后按编码排序，与（按编码排序的）索引做一次只向前的归并：
+           下一个编码不在当前索引块里时，用分桶表定位，再一次读入 PREFETCH_CHUNK 条索引，
+           同一块中的其它编码直接在内存里匹配（CJK 常用字往往相邻）；
+        2. 按位图在文件中的偏移排序后依次读取，连续的位图不需要再 seek。
+        最多预读缓存容量减去已用数量的字形，目标缓存已满的字形不读入，预读不会淘汰任何条目。
+        返回实际放进缓存的字形数。
+        """
+        if not self._f:
+            return 0
+        room = self._cache.capacity - len(self._cache) + self._small.capacity - len(self._small)
+        if room <= 0:
+            return 0
+        codes = []
+        seen = set()
+        for char in text:
+            code = ord(char)
+            if (code in seen or code in self._cache or code in self._small or code in self._missing
+                    or code < 32 or code > 0xFFFF):
+                continue
+            if len(codes) >= room:
+                break
+            seen.add(code)
+            codes.append(code)
+        if not codes:
+            return 0
+        codes.sort()
+        count = 0
+        if self._pack:
+            found = self._pack._resolve(codes)
+            count += self._read_sorted(self._pack, found)
+            in_pack = set(code for _, code in found)
+            codes = [code for code in codes if code not in in_pack]
+        return count + self._read_sorted(self, self._resolve(codes))
+
+    def _resolve(self, codes):
+        """已排序的 codes 与索引归并，返回按文件偏移排序的 [(索引项, 编码)]；没找到的记入负缓存"""
+        f = self._f
+        chunk = self._scan
+        start = end = 0  # chunk 中是索引的 [start, end) 条
+        pos = 0  # 归并位置：chunk 内下一条待比较的条目
+        found = []
+        for code in codes:
+            if end == start or struct.unpack_from('<H', chunk, (end - start - 1) * 6)[0] < code:
+                start = self._chunk_start(code, end)
+                if start >= self.char_count:
+                    break
+                f.seek(self.index_offset + start * 6)
+                end = start + (f.readinto(chunk) or 0) // 6
+                end = min(end, self.char_count)
+                pos = start
+            while pos < end:
+                key, offset = struct.unpack_from('<HI', chunk, (pos - start) * 6)
+                if key >= code:
+                    if key == code:
+                        found.append((offset, code))
+                    break
+                pos += 1
+            if not found or found[-1][1] != code:
+                self._remember_missing(code)
+        found.sort(key=lambda item: item[0] & GLYPH_OFFSET_MASK)
+        return found
+
+    def _read_sorted(self, font, found):
+        """按偏移顺序把 font（自身或字形包）中的字形读进缓存，相邻的字形不再 seek"""
+        where = -1
+        count = 0
+        for entry, code in found:
+            offset = entry & GLYPH_OFFSET_MASK
+            if offset != where:
+                font._f.seek(offset)
+            box = font._read_box(entry)
+            where = offset + len(box) - (0 if entry & GLYPH_TRIMMED else GLYPH_HEADER)
+            if self._store(code, box, evict=False):
+                count += 1
+        return count
+
+    def _read_box(self, entry):
+        """
+        从文件当前位置读索引项 entry 对应的字形到 self._box，
+        返回边框 + 边框内的行（未裁剪的字形补上整字边框）的 memoryview
+        """
+        box = self._box
+        if not entry & GLYPH_TRIMMED:
+            box[0] = 0
+            box[1] = self.font_height
+            box[2] = self.glyph_bytes // self.font_height
+            self._f.readinto(box[GLYPH_HEADER:])
+            return box
+        self._f.readinto(box[:GLYPH_HEADER])
+        end = GLYPH_HEADER + box[1] * (box[2] & 0x0F)
+        self._f.readinto(box[GLYPH_HEADER:end])
+        return box[:end]
+
+    def _expand(self, box):
+        """边框 + 行 → 完整位图（整字边框时直接切片，否则展开到 self._full）"""
+        top, rows, cols = box[0], box[1], box[2]
+        row_bytes = self.glyph_bytes // self.font_height
+        if rows == self.font_height and cols == row_bytes:
+            return box[GLYPH_HEADER:GLYPH_HEADER + self.glyph_bytes]
+        full = self._full
+        first, width = cols >> 4, cols & 0x0F
+        for i in range(self.glyph_bytes):
+            full[i] = 0
+        for r in range(rows):
+            dst = (top + r) * row_bytes + first
+            src = GLYPH_HEADER + r * width
+            full[dst:dst + width] = box[src:src + width]
+        return full
+
+    def _store(self, char_code, box, evict=True):
+        """
+        把读出的字形放进对应的缓存，返回 (位图, 行首, 行数, 列字节 << 4 | 每行字节数)；
+        evict=False 时目标缓存已满就不放，返回 None（预读不淘汰正在使用的字形）
+        """
+        if len(box) <= SMALL_GLYPH_SLOT and self._small.capacity:
+            cache = self._small
+        else:
+            cache = self._cache
+        if not evict and len(cache) >= cache.capacity:
             return None
+        if cache is self._small:
+            box = cache.put(char_code, box)
+            return box[GLYPH_HEADER:], box[0], box[1], box[2]
+        return cache.put(char_code, self._expand(box)), 0, self.font_height, self.glyph_bytes // self.font_height
+
+    def _load_box(self, char_code):
+        """
+        加载字符，返回 (位图, 行首, 行数, 列字节 << 4 | 每行字节数)；
+        位图只含边框内的行和字节，是缓存槽的 memoryview，下一次加载前有效
+        """
+        if char_code in self._small:
+            box = self._small.get(char_code)
+            return box[GLYPH_HEADER:], box[0], box[1], box[2]
+        bitmap = self._cache.get(char_code)
+        if bitmap is not None:
+            return bitmap, 0, self.font_height, self.glyph_bytes // self.font_height
+        
+        font = self
+        entry = self._pack._find_char_offset(char_code) if self._pack else None
+        if entry is None:
+            entry = self._find_char_offset(char_code)
+            if entry is None:
+                return None
+        else:
+            font = self._pack
         
         try:
-            self._f.seek(offset)
-            bitmap = self._f.read(32)
-            
-            if len(self._cache) >= self.cache_size:
-                oldest = self._cache_order.pop(0)
-                del self._cache[oldest]
-            
-            self._cache[char_code] = bitmap
-            self._cache_order.append(char_code)
-            
-            return bitmap
+            font._f.seek(entry & GLYPH_OFFSET_MASK)
+            return self._store(char_code, font._read_box(entry))
         except Exception as e:
             print(f"Error loading char {char_code}: {e}")
             return None
+
+    def _load_char(self, char_code):
+        """加载字符的完整位图（glyph_bytes 字节，下一次加载前有效）"""
+        glyph = self._load_box(char_code)
+        if glyph is None:
+            return None
+        bitmap, top, rows, cols = glyph
+        if cols == self.glyph_bytes // self.font_height and rows == self.font_height:
+            return bitmap
+        box = self._box
+        box[0], box[1], box[2] = top, rows, cols
+        n = rows * (cols & 0x0F)
+        box[GLYPH_HEADER:GLYPH_HEADER + n] = bitmap[:n]
+        return self._expand(box)
+
+    def _glyph(self, char_code, size, bold=False):
+        """
+        返回 (位图, 宽, 高, dx, dy)：只含字形边框内的行和字节，绘制时偏移 (dx, dy)，空白行不画。
+        size>1 时查表放大，bold 时再做 row | (row >> 1) 加粗，
+        派生字形以 (字符, size, bold) 为键放进单独的小缓存
+        """
+        if size == 1 and not bold:
+            glyph = self._load_box(char_code)
+            if glyph is None:
+                return None
+            bitmap, top, rows, cols = glyph
+            return bitmap, (cols & 0x0F) * 8, rows, (cols >> 4) * 8, top
+        key = (char_code, size, bold)
+        glyph = self._derived.get(key)
+        if glyph is None:
+            glyph = self._derive(char_code, size, bold)
+            if glyph is None:
+                return None
+            self._derived.put(key, glyph)
+        return glyph
+
+    def _derive(self, char_code, size, bold):
+        """生成放大/加粗后的字形，不进缓存：加粗的放大字形只缓存最终结果，不缓存中间的放大字形"""
+        glyph = self._glyph(char_code, 1)
+        if glyph is None:
+            return None
+        bitmap, width, height, dx, dy = glyph
+        if size > 1:
+            bitmap, width, height = scale_bits(bitmap, width, height, size)
+            dx, dy = dx * size, dy * size
+        if bold:
+            bitmap, width, height = embolden_bits(bitmap, width, height)
+        return bitmap, width, height, dx, dy
     
-    def draw_char(self, char, x, y, framebuffer, color, size=1):
+    def draw_char(self, char, x, y, framebuffer, color, size=1, bold=False):
         """绘制单个字符"""
-        size = max(size, 1)
-        char_code = ord(char)
-        
-        bitmap = self._load_char(char_code)
-        if bitmap is None:
+        glyph = self._glyph(ord(char), max(size, 1), bold)
+        if glyph is None:
             return
-        
-        for row in range(self.font_height):
-            for col_byte in range(self.font_width // 8):
-                byte_idx = row * (self.font_width // 8) + col_byte
-                if byte_idx >= len(bitmap):
-                    continue
-                
-                byte_val = bitmap[byte_idx]
-                
-                for bit in range(8):
-                    if byte_val & (1 << (7 - bit)):
-                        px = x + (col_byte * 8 + bit) * size
-                        py = y + row * size
-                        framebuffer.fill_rect(px, py, size, size, color)
+        bitmap, width, height, dx, dy = glyph
+        if height:
+            framebuffer.blit_glyph(bitmap, x + dx, y + dy, width, height, color)
     
     def width(self, text):
         """返回文本的像素宽度（支持 ASCII 半宽和中文全宽）"""
@@ -519,14 +1582,22 @@ class UnifiedBitmapFont:
                 total_w += self.font_width
         return total_w
     
+    def cache_stats(self):
+        """返回 (字形缓存, 小字形缓存, 派生字形缓存) 各自的 (容量, 已用, 命中, 未命中, 淘汰)"""
+        return self._cache.stats(), self._small.stats(), self._derived.stats()
+
     def clear_cache(self):
         """清空缓存"""
         self._cache.clear()
-        self._cache_order.clear()
+        self._small.clear()
+        self._derived.clear()
     
     def deinit(self):
         """清理资源"""
         self.clear_cache()
+        if self._pack:
+            self._pack.deinit()
+            self._pack = None
         if self._f:
             self._f.close()
             self._f = None
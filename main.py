@@ -64,14 +64,29 @@ def main():
         # 获取远程数据
         info1 = net.fetch_content(KV_BASE_URL + "info1")
         info2 = net.fetch_content(KV_BASE_URL + "info2")
+        # 与内容配套的字形包，下载失败时沿用旧文件或直接用完整字体
+        from config import GLYPH_PACK_FILE, GLYPH_PACK_KEY
+        if GLYPH_PACK_FILE and GLYPH_PACK_KEY:
+            net.fetch_file(KV_BASE_URL + GLYPH_PACK_KEY, GLYPH_PACK_FILE)
         
         gc.collect()
         
         # 4. 初始化显示屏并绘制
-        epd = hw.init_display()
+        # 面板延迟到确定需要刷新时才唤醒，画面未变化时完全不上电
+        epd = hw.init_display(init=False)
         epd.clear_frame(BUF)
         
-        ui.draw_dashboard(epd, BUF, info1, info2, sensor_data)
+        timings = epd.instrument()
+        policy = pwr.RefreshPolicy()
+        mode = ui.draw_dashboard(epd, BUF, info1, info2, sensor_data, policy=policy)
+        if mode != policy.SKIP:
+            # 刷新等待在 BUSY 变为空闲时立即返回，随后直接进入深度睡眠
+            print(f"Panel refresh busy for {epd.last_busy_ms} ms")
+            print(f"EPD timings: {timings.summary()}")
+            pwr.save_epd_timings(timings)
+            from config import TELEMETRY_ENABLED, TELEMETRY_KEY
+            if TELEMETRY_ENABLED:
+                net.post_content(KV_BASE_URL + TELEMETRY_KEY, timings.summary())
         
         from config import DEEP_SLEEP_ENABLED
         if DEEP_SLEEP_ENABLED:
@@ -51,8 +51,9 @@ def get_buffer():
     return _buf
 
 
-def init_display():
-    """Initialize and return the EPD instance."""
+def init_display(init=True):
+    """Initialize and return the EPD instance.
+    init=False 时只创建实例，面板在首次上传前由调用方 epd.init() 唤醒。"""
     try:
         cs = Pin(PIN_CS)
         dc = Pin(PIN_DC)
@@ -63,7 +64,8 @@ def init_display():
                   sck=Pin(PIN_SCK), miso=Pin(12), mosi=Pin(PIN_MOSI))
         
         epd = epaper7in5b.EPD(spi, cs, dc, rst, busy)
-        epd.init()
+        if init:
+            epd.init()
         return epd
     except Exception as e:
         print(f"Display initialization failed: {e}")
@@ -71,3 +71,61 @@ def fetch_content(url, timeout=10):
     except Exception as e:
         print(f"Fetch failed: {e}")
         return None, str(e)
+
+
+def fetch_file(url, path, timeout=10, chunk_size=1024):
+    """
+    Download URL to a file in chunks (e.g. the glyph pack).
+    Writes to path + '.tmp' first, so a failed download keeps the old file.
+    Returns: error_msg or None
+    """
+    import os
+    import urequests
+    print(f"Fetching: {url} -> {path}")
+    tmp = path + '.tmp'
+    try:
+        response = urequests.get(url, timeout=timeout)
+        try:
+            if response.status_code != 200:
+                return f"HTTP {response.status_code}"
+            buf = bytearray(chunk_size)
+            size = 0
+            with open(tmp, 'wb') as f:
+                while True:
+                    n = response.raw.readinto(buf)
+                    if not n:
+                        break
+                    f.write(buf if n == chunk_size else memoryview(buf)[:n])
+                    size += n
+        finally:
+            response.close()
+        if not size:
+            os.remove(tmp)
+            return "Empty content"
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        os.rename(tmp, path)
+        return None
+    except Exception as e:
+        print(f"Fetch failed: {e}")
+        return str(e)
+
+
+def post_content(url, data, timeout=10):
+    """
+    POST text/bytes to URL (e.g. mem-kv).
+    Returns: error_msg or None
+    """
+    import urequests
+    try:
+        response = urequests.post(url, data=data, timeout=timeout)
+        status = response.status_code
+        response.close()
+        if status in (200, 201, 204):
+            return None
+        return f"HTTP {status}"
+    except Exception as e:
+        print(f"Post failed: {e}")
+        return str(e)
@@ -6,8 +6,15 @@ import struct
 # We use RTC memory to persist state across deep sleep cycles.
 # - Magic Header (4 bytes): To verify valid data
 # - Task State (variable): Application specific state
+#   [0:8]   wake count: magic, count
+#   [8:28]  frame state: magic, content crc, status crc, yellow crc, wakes since full refresh
+#   [28:57] last EPD timings record (lib.epaper7in5b.EPDTimings.pack())
 
 RTC_MAGIC = 0xDEADBEEF
+FRAME_MAGIC = 0x46524D45
+FRAME_STATE_OFFSET = 8
+FRAME_STATE_FORMAT = 'IIIII'
+EPD_TIMINGS_OFFSET = 28
 
 # Battery Measurement Pins
 PIN_BAT_ADC = 36
@@ -43,12 +50,40 @@ class StateManager:
     def load(self):
         """Load bytes from RTC memory."""
         return self.rtc.memory()
+
+    def load_at(self, offset, size):
+        """Load `size` bytes at `offset`, or None if RTC memory is shorter."""
+        data = self.load()
+        if len(data) < offset + size:
+            return None
+        return data[offset:offset + size]
+
+    def save_at(self, offset, data):
+        """Overwrite bytes at `offset`, keeping the rest of RTC memory intact."""
+        old = bytes(self.load())
+        if len(old) < offset:
+            old += bytes(offset - len(old))
+        self.save(old[:offset] + data + old[offset + len(data):])
     
     def clear(self):
         """Clear RTC memory."""
         self.rtc.memory(b'')
 
 
+def save_epd_timings(timings):
+    """Persist the last refresh's EPDTimings record in RTC memory."""
+    StateManager().save_at(EPD_TIMINGS_OFFSET, timings.pack())
+
+
+def load_epd_timings():
+    """Return the EPDTimings saved by the previous wake, or None."""
+    from lib.epaper7in5b import EPDTimings
+    data = StateManager().load_at(EPD_TIMINGS_OFFSET, EPDTimings.SIZE)
+    if not data:
+        return None
+    return EPDTimings.unpack(data)
+
+
 def read_battery_info(adc_pin=PIN_BAT_ADC, pwr_en_pin=PIN_BAT_PWR_EN, attenuation=machine.ADC.ATTN_11DB):
     """
     获取详细的电池信息
@@ -156,13 +191,13 @@ class WakeScheduler:
         """增加唤醒次数"""
         count = self.get_wake_count() + 1
         data = struct.pack('II', RTC_MAGIC, count)
-        self.state_mgr.save(data)
+        self.state_mgr.save_at(0, data)
         return count
     
     def reset_wake_count(self):
         """重置唤醒次数"""
         data = struct.pack('II', RTC_MAGIC, 0)
-        self.state_mgr.save(data)
+        self.state_mgr.save_at(0, data)
     
     def schedule_next_wake(self, default_interval=300):
         """
@@ -194,3 +229,61 @@ class WakeScheduler:
         except Exception as e:
             print(f"Schedule alignment failed: {e}, using default {default_interval}s")
             deep_sleep(default_interval)
+
+
+class RefreshPolicy:
+    """
+    根据上次刷新时保存在 RTC 内存中的位平面指纹决定本次刷新方式：
+    - SKIP: 黑/黄图层完全相同，不上传也不刷新
+    - PARTIAL: 只有状态栏变化，局部快刷状态栏
+    - FAST: 黄色层未变、内容变化，整屏黑白快刷（fast_refresh=False 时改为 FULL）
+    - FULL: 黄色层变化，或距上次全刷已满 force_every 次唤醒（三色全刷，消除残影）
+    """
+    SKIP = 'skip'
+    PARTIAL = 'partial'
+    FAST = 'fast'
+    FULL = 'full'
+
+    def __init__(self, force_every=None, fast_refresh=None):
+        if force_every is None:
+            from config import FORCE_REFRESH_EVERY
+            force_every = FORCE_REFRESH_EVERY
+        if fast_refresh is None:
+            from config import FAST_REFRESH_ENABLED
+            fast_refresh = FAST_REFRESH_ENABLED
+        self.force_every = force_every
+        self.fast_refresh = fast_refresh
+        self.state_mgr = StateManager()
+        self.last = None
+        self.since_full = 0
+        try:
+            data = self.state_mgr.load_at(FRAME_STATE_OFFSET, struct.calcsize(FRAME_STATE_FORMAT))
+            if data:
+                magic, content, status, yellow, since_full = struct.unpack(FRAME_STATE_FORMAT, data)
+                if magic == FRAME_MAGIC:
+                    self.last = (content, status, yellow)
+                    self.since_full = since_full
+        except:
+            pass
+
+    def decide(self, content, status, yellow):
+        """根据本次渲染的指纹返回 SKIP / PARTIAL / FAST / FULL"""
+        if self.last is None:
+            return self.FULL
+        if self.force_every > 0 and self.since_full + 1 >= self.force_every:
+            return self.FULL
+        last_content, last_status, last_yellow = self.last
+        if yellow != last_yellow:
+            return self.FULL
+        if content != last_content:
+            return self.FAST if self.fast_refresh else self.FULL
+        if status != last_status:
+            return self.PARTIAL
+        return self.SKIP
+
+    def commit(self, content, status, yellow, mode):
+        """刷新成功后保存本次指纹，刷新失败时不调用，下次唤醒将全刷"""
+        self.since_full = 0 if mode == self.FULL else self.since_full + 1
+        self.last = (content, status, yellow)
+        data = struct.pack(FRAME_STATE_FORMAT, FRAME_MAGIC, content, status, yellow, self.since_full)
+        self.state_mgr.save_at(FRAME_STATE_OFFSET, data)
@@ -1,6 +1,9 @@
 import gc
-import utime
-from lib.epaper7in5b import black, white
+try:
+    import utime
+except ImportError:  # 主机侧模拟器
+    import time as utime
+from lib.epaper7in5b import black, white, REFRESH_FULL, REFRESH_FAST
 from lib.framebuf2 import FrameBuffer, MHMSB
 
 # 字间距配置 (0 为不额外增加间距)
@@ -9,6 +12,12 @@ SPACING_SUBHEADER = 2
 SPACING_BODY = 0
 SPACING_STATUS = 0
 
+# 底部状态栏位置（一行 16px 文字）
+STATUS_Y = 460
+STATUS_HEIGHT = 16
+# 正文最后一行的起始 y：保证整行落在栏内，并与状态栏留出间隔
+LAST_LINE_Y = STATUS_Y - 20
+
 def get_char_width(char, size=1, spacing=0):
     """获取单个字符的显示宽度 (与 framebuf2 逻辑保持一致)"""
     # ASCII(及一度)使用半宽 (8px), 其他使用全宽 (16px)
@@ -152,32 +161,36 @@ def wrap_text(text, max_width, size=1, spacing=0):
 
 
 
-def draw_dashboard(epd, buf, info1_data, info2_data, sensors):
+def draw_dashboard(epd, buf, info1_data, info2_data, sensors, status_only=False, policy=None):
     """
     绘制双屏仪表盘内容：文字用黑色，分割线用黄色
+    status_only=True 表示版面结构与上次相同，只局部上传并刷新状态栏所在的行
+    policy: power.RefreshPolicy，按位平面指纹决定跳过/局部/快刷/全刷，返回所选模式
     """
     gc.collect() # 绘制前清理
     
     fb = FrameBuffer(buf, epd.width, epd.height, MHMSB)
+    # 左右两栏各自一个共享内存的子视图，内容被裁剪在本栏内，不会溢出到另一栏或状态栏
+    half = epd.width // 2
+    panels = (fb.view(0, 0, half, STATUS_Y), fb.view(half, 0, half, STATUS_Y))
     
-    def bold_text(text, x, y, color, size=1, spacing=0):
+    def bold_text(panel, text, x, y, color, size=1, spacing=0):
         """绘制加粗且支持字间距的文本"""
-        fb.text(text, x, y, color, size=size, spacing=spacing)
-        fb.text(text, x + 1, y, color, size=size, spacing=spacing)
+        panel.text(text, x, y, color, size=size, spacing=spacing, bold=True)
 
-    def render_content(x_offset, default_title, content, err, only_lines=False):
+    def render_content(panel, default_title, content, err, only_lines=False):
         title = default_title
         MAX_WIDTH = 360 # 优化：利用更多宽度 (380 - 20)
         
         # 使用更省内存的方式处理每一行
         if err:
             if not only_lines:
-                fb.text(f"Error: {err}", x_offset + 20, 90, black, size=1, spacing=SPACING_BODY)
+                panel.text(f"Error: {err}", 20, 90, black, size=1, spacing=SPACING_BODY)
             return
 
         if not content:
             if not only_lines:
-                fb.text("No data", x_offset + 20, 90, black, size=1, spacing=SPACING_BODY)
+                panel.text("No data", 20, 90, black, size=1, spacing=SPACING_BODY)
             return
 
         # 找到第一行标题
@@ -191,15 +204,15 @@ def draw_dashboard(epd, buf, info1_data, info2_data, sensors):
             rest = content
 
         if only_lines:
-            fb.line(x_offset + 20, 65, x_offset + 380, 65, black)
-            fb.line(x_offset + 20, 66, x_offset + 380, 66, black)
+            panel.line(20, 65, 380, 65, black)
+            panel.line(20, 66, 380, 66, black)
             return
 
         # 绘制主标题 (支持换行，虽然通常不应换行)
         title_lines = wrap_text(title, MAX_WIDTH, size=2, spacing=SPACING_TITLE)
         ty = 30
         for t_line in title_lines:
-            bold_text(t_line, x_offset + 20, ty, black, size=2, spacing=SPACING_TITLE)
+            bold_text(panel, t_line, 20, ty, black, size=2, spacing=SPACING_TITLE)
             ty += 32 # 大标题行高
             
         y = 90
@@ -218,28 +231,42 @@ def draw_dashboard(epd, buf, info1_data, info2_data, sensors):
                 y += 10
                 continue
             
-            if y > 440: break
+            if y > LAST_LINE_Y: break
             
             if line.startswith('#'):
                 h_text = line.lstrip('#').strip()
                 # 子标题加粗，增加间距防止重叠，支持自动换行
                 h_lines = wrap_text(h_text, MAX_WIDTH, size=1, spacing=SPACING_SUBHEADER)
                 for h_line in h_lines:
-                    if y > 440: break
-                    bold_text(h_line, x_offset + 20, y, black, size=1, spacing=SPACING_SUBHEADER)
+                    if y > LAST_LINE_Y: break
+                    bold_text(panel, h_line, 20, y, black, size=1, spacing=SPACING_SUBHEADER)
                     y += 32
             else:
                 # 正文使用常规字体，支持自动换行
                 b_lines = wrap_text(line, MAX_WIDTH, size=1, spacing=SPACING_BODY)
                 for b_line in b_lines:
-                    if y > 440: break
-                    fb.text(b_line, x_offset + 20, y, black, size=1, spacing=SPACING_BODY)
+                    if y > LAST_LINE_Y: break
+                    panel.text(b_line, 20, y, black, size=1, spacing=SPACING_BODY)
                     y += 28
 
+    def draw_yellow():
+        """黄色图层：标题下的分割线"""
+        fb.fill(white)
+        render_content(panels[0], "INFO 1", info1_data[0], info1_data[1], only_lines=True)
+        render_content(panels[1], "INFO 2", info2_data[0], info2_data[1], only_lines=True)
+
+    # --- 指纹：先画一遍黄色图层取指纹（只有几条线，开销很小） ---
+    mode = None
+    if policy:
+        draw_yellow()
+        yellow_fp = fb.fingerprint()
+
     # --- 第一阶段：绘制黑色图层（文字） ---
+    # 先把两栏正文用到的字形按索引顺序一次性读进缓存，绘制时不再逐字二分查找
+    fb.prefetch((info1_data[0] or '') + (info2_data[0] or ''))
     fb.fill(white)
-    render_content(0, "INFO 1", info1_data[0], info1_data[1], only_lines=False)
-    render_content(400, "INFO 2", info2_data[0], info2_data[1], only_lines=False)
+    render_content(panels[0], "INFO 1", info1_data[0], info1_data[1], only_lines=False)
+    render_content(panels[1], "INFO 2", info2_data[0], info2_data[1], only_lines=False)
     
     # 底部状态栏
     from config import TIMEZONE_OFFSET
@@ -247,7 +274,8 @@ def draw_dashboard(epd, buf, info1_data, info2_data, sensors):
     now_utc = utime.time()
     now_local = now_utc + (TIMEZONE_OFFSET * 3600)
     tm = utime.localtime(now_local)
-    date_str = f"{tm[0]}-{tm[1]:02d}-{tm[2]:02d} {tm[3]:02d}:{tm[4]:02d}:{tm[5]:02d}"
+    # 精确到分钟，画面不变时指纹才能命中
+    date_str = f"{tm[0]}-{tm[1]:02d}-{tm[2]:02d} {tm[3]:02d}:{tm[4]:02d}"
     
     parts = [date_str]
     if sensors.get('temp') is not None:
@@ -260,15 +288,48 @@ def draw_dashboard(epd, buf, info1_data, info2_data, sensors):
     
     status_str = " | ".join(parts)
     # 状态栏使用常规字体
-    fb.text(status_str, 20, 460, black, size=1, spacing=SPACING_STATUS)
-    
+    fb.reset_dirty()
+    fb.text(status_str, 20, STATUS_Y, black, size=1, spacing=SPACING_STATUS)
+
+    if policy:
+        content_fp = fb.fingerprint(0, STATUS_Y)
+        status_fp = fb.fingerprint(STATUS_Y)
+        mode = policy.decide(content_fp, status_fp, yellow_fp)
+        print(f"Refresh mode: {mode}")
+        if mode == policy.SKIP:
+            policy.commit(content_fp, status_fp, yellow_fp, mode)
+            return mode
+        status_only = status_only or mode == policy.PARTIAL
+
+    # 黄色层不变时（局部刷新或快刷）使用黑白快刷波形
+    fast = policy is not None and mode in (policy.PARTIAL, policy.FAST)
+    epd.set_refresh_mode(REFRESH_FAST if fast else REFRESH_FULL)
+    epd.init()
+    if status_only:
+        # 旧状态栏文字的长度未知，窗口取整行宽度，并至少覆盖整个文字行高
+        y0, y1 = STATUS_Y, STATUS_Y + STATUS_HEIGHT
+        dirty = fb.dirty_rect()
+        if dirty:
+            y0 = min(y0, dirty[1])
+            y1 = max(y1, dirty[1] + dirty[3])
+        epd.set_window(0, y0, epd.width, y1 - y0)
+
     epd.write_black_layer(buf)
     gc.collect() # 黑色层刷完后清理
 
-    # --- 第二阶段：绘制黄色图层（分割线） ---
-    fb.fill(white)
-    render_content(0, "INFO 1", info1_data[0], info1_data[1], only_lines=True)
-    render_content(400, "INFO 2", info2_data[0], info2_data[1], only_lines=True)
-    
-    epd.write_yellow_layer(buf, refresh=True)
+    # --- 第二阶段：绘制黄色图层（分割线），快刷时黄色层保持不动 ---
+    if fast:
+        epd.refresh()
+    else:
+        draw_yellow()
+        epd.write_yellow_layer(buf, refresh=True)
     gc.collect()
+    print(f"Refresh timings (count, last ms, total ms): {epd.refresh_stats}")
+    if hasattr(fb._font, 'cache_stats'):
+        # 每项都是 (容量, 已用, 命中, 未命中, 淘汰)，用于按部署调整 GLYPH_CACHE_SIZE
+        full, small, derived = fb._font.cache_stats()
+        print(f"Glyph cache (size, used, hits, misses, evictions): full={full} small={small} derived={derived}")
+
+    if policy:
+        policy.commit(content_fp, status_fp, yellow_fp, mode)
+    return mode
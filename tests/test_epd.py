@@ -0,0 +1,161 @@
+import sys
+import time
+import types
+
+import pytest
+
+from lib import epaper7in5b
+from tools import framebuf_host
+from tools.epd_sim import FakeSPI, make_epd
+
+FRAME_BYTES = epaper7in5b.EPD_WIDTH * epaper7in5b.EPD_HEIGHT // 8
+
+
+def test_write_buffer_streams_in_chunks():
+    epd = make_epd(chunk_size=4096)
+    epd.write_buffer(bytearray(FRAME_BYTES))
+    assert epd.spi.bytes == FRAME_BYTES
+    assert epd.spi.transactions == (FRAME_BYTES + 4095) // 4096
+    assert epd.cs.value() == 1
+
+
+def test_write_layer_is_one_command_plus_data():
+    spi = FakeSPI()
+    epd = make_epd(spi, chunk_size=FRAME_BYTES)
+    epd.write_black_layer(bytearray(FRAME_BYTES))
+    assert spi.transactions == 2
+    assert spi.bytes == FRAME_BYTES + 1
+
+
+def test_write_buffer_accepts_int_lists():
+    epd = make_epd(chunk_size=100)
+    epd.write_buffer([0xFF] * 250)
+    assert epd.spi.bytes == 250
+    assert epd.spi.transactions == 3
+
+
+def test_clear_layer_streams_white_stripe():
+    epd = make_epd()
+    epd.clear_black_layer()
+    stripe = epd.width // 8 * epaper7in5b.WHITE_STRIPE_ROWS
+    assert epd.spi.bytes == FRAME_BYTES + 1
+    assert epd.spi.transactions == 1 + FRAME_BYTES // stripe
+
+
+def test_clear_frame_fills_both_planes():
+    epd = make_epd()
+    black = bytearray(FRAME_BYTES)
+    yellow = bytearray(FRAME_BYTES)
+    epd.clear_frame(black, yellow)
+    assert black == yellow == bytearray(b'\xff') * FRAME_BYTES
+
+
+def test_wait_until_idle_returns_busy_duration():
+    epd = make_epd()
+    epd.busy.busy_for(30)
+    elapsed = epd.wait_until_idle()
+    assert 30 <= elapsed < 30 + 5 * epaper7in5b.BUSY_POLL_MS
+    assert epd.last_busy_ms == elapsed
+
+
+def test_light_sleep_wait_wakes_on_busy_pin(monkeypatch):
+    naps = []
+
+    def lightsleep(ms):
+        naps.append((ms, epd.busy.wake))
+        time.sleep(0.03)  # 假设 BUSY 变高把芯片提前唤醒
+
+    monkeypatch.setitem(sys.modules, 'machine', types.SimpleNamespace(SLEEP=2, lightsleep=lightsleep))
+    epd = make_epd()
+    epd.busy.busy_for(20)
+    epd.wait_until_idle(timeout_ms=1000, light_sleep=True)
+    assert len(naps) == 1 and naps[0][0] > epaper7in5b.LIGHT_SLEEP_MS
+    assert naps[0][1] == (epd.busy.WAKE_HIGH, 2)
+    assert epd.busy.wake is None
+
+
+def test_wait_until_idle_times_out():
+    epd = make_epd()
+    epd.busy.busy_for(10000)
+    with pytest.raises(RuntimeError):
+        epd.wait_until_idle(timeout_ms=20)
+
+
+def test_display_window_uploads_only_window_rows():
+    epd = make_epd()
+    buf = bytearray(FRAME_BYTES)
+    assert epd.set_window(13, 460, 30, 16) == (8, 460, 48, 476)
+    epd.spi.reset()
+    epd.write_black_layer(buf)
+    assert epd.spi.bytes == 1 + 5 * 16
+    epd.clear_yellow_layer()
+    assert epd.spi.bytes == 2 + 2 * 5 * 16
+    epd.refresh()
+    assert epd._window is None
+
+
+def test_full_width_window_is_one_stream():
+    epd = make_epd()
+    epd.set_window(0, 100, epd.width, 10)
+    epd.spi.reset()
+    epd.write_buffer(bytearray(FRAME_BYTES))
+    assert epd.spi.transactions == 1
+    assert epd.spi.bytes == epd.width // 8 * 10
+
+
+def test_fast_mode_uploads_black_plane_only():
+    epd = make_epd()
+    epd.set_refresh_mode(epaper7in5b.REFRESH_FAST)
+    epd.init()
+    epd.spi.reset()
+    epd.write_black_layer(bytearray(FRAME_BYTES))
+    epd.write_yellow_layer(bytearray(FRAME_BYTES), refresh=True)
+    assert epd.spi.bytes == 1 + FRAME_BYTES + 1
+    assert epd.refresh_stats['fast'][0] == 1
+
+
+def _small_epd(width=16, height=2):
+    epd = make_epd()
+    epd.width, epd.height = width, height
+    return epd
+
+
+def test_get_frame_buffer_thresholds_into_packed_planes():
+    epd = _small_epd()
+    gray = bytes([0, 100, 255, 255, 255, 255, 255, 255] + [255] * 8 + [100] * 16)
+    black, yellow = epd.get_frame_buffer(gray)
+    assert black == bytearray([0x7F, 0xFF, 0xFF, 0xFF])
+    assert yellow == bytearray([0xBF, 0xFF, 0x00, 0x00])
+
+
+def test_stream_frame_matches_get_frame_buffer():
+    epd = _small_epd()
+    writes = []
+    epd.spi.write = lambda data: writes.append(bytes(data))
+    gray = bytes(range(0, 256, 8))
+    black, yellow = epd.get_frame_buffer(gray)
+    epd.stream_frame(gray, refresh=False)
+    assert writes == [bytes([0x10]), black[:2], black[2:], bytes([0x13]), yellow[:2], yellow[2:]]
+
+
+def test_numpy_path_matches_row_path():
+    pytest.importorskip('numpy')
+    epd = _small_epd(64, 8)
+    gray = bytes((i * 37) & 0xFF for i in range(64 * 8))
+    assert framebuf_host.frame_buffer(epd, gray) == epd.get_frame_buffer(gray)
+
+
+def test_instrumentation_records_phases_and_bytes():
+    epd = make_epd()
+    timings = epd.instrument()
+    epd.write_black_layer(bytearray(FRAME_BYTES))
+    epd.clear_yellow_layer()
+    epd.refresh()
+    assert timings.bytes == 2 * FRAME_BYTES
+    assert timings.spans_us[epaper7in5b.PHASE_BLACK] > 0
+    data = timings.pack()
+    assert len(data) == epaper7in5b.EPDTimings.SIZE
+    restored = epaper7in5b.EPDTimings.unpack(data)
+    assert restored.spans_us == timings.spans_us
+    assert restored.bytes == timings.bytes
+    assert 'black=' in restored.summary()
@@ -0,0 +1,596 @@
+import os
+import random
+import struct
+import sys
+import types
+
+import pytest
+
+from lib.framebuf2 import (BitmapFile, BitmapFont, FrameBuffer, GlyphCache, MHMSB, MHMSBFormat, UnifiedBitmapFont,
+                           embolden_bits, FONT_BUCKET_SIZE, rle_encode, scale_bits, scale_table)
+from tools import fb_dump, framebuf_host, generate_unified_font
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def make_fb(width=64, height=32):
+    return FrameBuffer(bytearray(width * height // 8), width, height, MHMSB)
+
+
+def test_dirty_rect_tracks_drawing():
+    fb = make_fb()
+    assert fb.dirty_rect() is None
+    fb.pixel(3, 4, 1)
+    fb.fill_rect(10, 2, 5, 3, 1)
+    assert fb.dirty_rect() == (3, 2, 12, 3)
+    fb.reset_dirty()
+    fb.hline(-5, 31, 100, 1)
+    assert fb.dirty_rect() == (0, 31, 64, 1)
+
+
+def test_fingerprint_covers_only_requested_rows():
+    fb = make_fb()
+    base_top, base_bottom = fb.fingerprint(0, 16), fb.fingerprint(16)
+    fb.pixel(5, 20, 1)
+    assert fb.fingerprint(0, 16) == base_top
+    assert fb.fingerprint(16) != base_bottom
+
+
+def reference_fill_rect(fb, x, y, width, height, color):
+    for _y in range(y, y + height):
+        for _x in range(x, x + width):
+            MHMSBFormat.set_pixel(fb, _x, _y, color)
+
+
+def test_fill_rect_matches_per_pixel_reference():
+    rng = random.Random(1)
+    fb, ref = make_fb(), make_fb()
+    for _ in range(300):
+        x, y = rng.randrange(64), rng.randrange(32)
+        w, h = rng.randrange(1, 65 - x), rng.randrange(1, 33 - y)
+        color = rng.randrange(2)
+        MHMSBFormat.fill_rect(fb, x, y, w, h, color)
+        reference_fill_rect(ref, x, y, w, h, color)
+        assert fb.buf == ref.buf
+
+
+def reference_glyph(fb, data, x, y, width, height, color):
+    row = (width + 7) // 8
+    for r in range(height):
+        for c in range(width):
+            if data[r * row + c // 8] & (0x80 >> (c % 8)):
+                fb.pixel(x + c, y + r, color)
+
+
+def test_blit_glyph_matches_per_pixel_reference():
+    rng = random.Random(2)
+    for rotation, width, stride in ((0, 64, 64), (0, 60, 64), (1, 64, 64), (2, 64, 64), (3, 64, 64)):
+        fb = FrameBuffer(bytearray(stride * 32 // 8), width, 32, MHMSB, stride=stride)
+        ref = FrameBuffer(bytearray(stride * 32 // 8), width, 32, MHMSB, stride=stride)
+        fb.rotation = ref.rotation = rotation
+        for _ in range(100):
+            gw, gh = rng.choice((16, 8, 11)), rng.randrange(1, 17)
+            data = bytes(rng.randrange(256) for _ in range((gw + 7) // 8 * gh))
+            x, y = rng.randrange(-20, 70), rng.randrange(-20, 40)
+            color = rng.randrange(2)
+            fb.blit_glyph(data, x, y, gw, gh, color)
+            reference_glyph(ref, data, x, y, gw, gh, color)
+            assert fb.buf == ref.buf
+
+
+def test_scale_bits_repeats_each_bit():
+    data, width, height = scale_bits(bytes([0b10100000, 0b01000000]), 3, 2, 3)
+    assert (width, height) == (24, 6)
+    rows = [bytes(data[i:i + 3]) for i in range(0, len(data), 3)]
+    assert rows[:3] == [bytes([0b11100011, 0b10000000, 0])] * 3
+    assert rows[3:] == [bytes([0b00011100, 0, 0])] * 3
+    assert scale_table(2)[0b1001 * 2 + 1] == 0b11000011
+
+
+def test_embolden_bits_matches_double_draw():
+    rng = random.Random(3)
+    for width in (7, 8, 16, 13):
+        data = bytes(rng.randrange(256) for _ in range((width + 7) // 8 * 5))
+        bold, bold_width, height = embolden_bits(data, width, 5)
+        assert (bold_width, height) == (width + 1, 5)
+        fb, ref = make_fb(), make_fb()
+        fb.blit_glyph(bold, 9, 3, bold_width, height, 1)
+        ref.blit_glyph(data, 9, 3, width, 5, 1)
+        ref.blit_glyph(data, 10, 3, width, 5, 1)
+        assert fb.buf == ref.buf
+
+
+def reference_blit(fb, src, x, y, key):
+    for sy in range(src.height):
+        for sx in range(src.width):
+            c = src.pixel(sx, sy)
+            if c != key:
+                fb.pixel(x + sx, y + sy, c)  # pixel 按旋转后的坐标自行裁剪
+
+
+def test_blit_framebuffer_matches_per_pixel_reference():
+    rng = random.Random(5)
+    for _ in range(200):
+        src = make_fb(rng.choice((8, 16, 24)), rng.randrange(1, 12))
+        src.buf[:] = bytes(rng.randrange(256) for _ in range(len(src.buf)))
+        src.width -= rng.randrange(8)
+        fb, ref = make_fb(), make_fb()
+        noise = bytes(rng.randrange(256) for _ in range(len(fb.buf)))
+        fb.buf[:] = ref.buf[:] = noise
+        x, y = rng.randrange(-20, 70), rng.randrange(-12, 36)
+        if rng.random() < 0.5:
+            x &= ~7
+        key = rng.choice((-1, 0, 1))
+        fb.blit(src, x, y, key)
+        reference_blit(ref, src, x, y, key)
+        assert fb.buf == ref.buf, (src.width, x, y, key)
+
+
+def test_blit_rotated_matches_per_pixel_reference():
+    rng = random.Random(11)
+    for rotation in (1, 2, 3):
+        for _ in range(60):
+            src = make_fb(rng.choice((8, 16)), rng.randrange(1, 10))
+            src.buf[:] = bytes(rng.randrange(256) for _ in range(len(src.buf)))
+            fb, ref = make_fb(), make_fb()
+            fb.rotation = ref.rotation = rotation
+            # 旋转后逻辑尺寸为 32x64 或 64x32，覆盖负偏移和越界部分
+            x, y = rng.randrange(-16, 70), rng.randrange(-12, 70)
+            key = rng.choice((-1, 0, 1))
+            fb.blit(src, x, y, key)
+            reference_blit(ref, src, x, y, key)
+            assert fb.buf == ref.buf, (rotation, x, y, key)
+    sprite = make_fb(8, 4)
+    fb = make_fb()
+    fb.fill(1)
+    fb.rotation = 1
+    fb.blit(sprite, 0, 40)
+    assert sum(1 for py in range(64) for px in range(32) if fb.pixel(px, py) == 0) == 32
+
+
+def test_blit_streams_pbm_rows(tmp_path):
+    path = tmp_path / 'icon.pbm'
+    path.write_bytes(b'P4\n# icon\n10 2\n' + bytes([0b11000000, 0b01000000, 0b00000000, 0b11000000]))
+    fb = make_fb(16, 2)
+    fb.fill(1)
+    with BitmapFile(str(path)) as icon:
+        assert (icon.width, icon.height) == (10, 2)
+        fb.blit(icon, 0, 0, key=1)
+    assert bytes(fb.buf) == bytes([0b00111111, 0b10111111, 0b11111111, 0b00111111])
+
+
+def rotate(fb, x, y):
+    """旋转前 FrameBuffer.pixel 里的坐标变换"""
+    return {
+        0: (x, y),
+        1: (fb.width - y - 1, x),
+        2: (fb.width - x - 1, fb.height - y - 1),
+        3: (y, fb.height - x - 1),
+    }[fb.rotation]
+
+
+def test_rotation_rebinds_pixel_and_rect():
+    rng = random.Random(4)
+    for rotation in (1, 2, 3, 0):
+        fb, ref = make_fb(), make_fb()
+        fb.rotation = 3
+        fb.rotation = ref.rotation = rotation
+        for _ in range(50):
+            x, y = rng.randrange(-4, 64), rng.randrange(-4, 64)
+            w, h = rng.randrange(1, 20), rng.randrange(1, 20)
+            color = rng.randrange(2)
+            fb.fill_rect(x, y, w, h, color)
+            for _x in range(x, x + w):
+                for _y in range(y, y + h):
+                    px, py = rotate(ref, _x, _y)
+                    if 0 <= px < ref.width and 0 <= py < ref.height:
+                        MHMSBFormat.set_pixel(ref, px, py, color)
+            assert fb.buf == ref.buf
+            px, py = rotate(fb, x, y)
+            if 0 <= px < fb.width and 0 <= py < fb.height:
+                assert fb.pixel(x, y) == MHMSBFormat.get_pixel(fb, px, py)
+    assert 'pixel' not in vars(fb)
+
+
+def test_scroll_matches_per_pixel_reference():
+    rng = random.Random(6)
+    for width, stride in ((64, 64), (60, 64), (60, 60)):
+        for dx, dy in ((0, 5), (0, -7), (3, 0), (-11, 0), (9, -2), (-1, 4), (-17, -30)):
+            fb = FrameBuffer(bytearray(stride * 32 // 8), width, 32, MHMSB, stride=stride)
+            ref = FrameBuffer(bytearray(stride * 32 // 8), width, 32, MHMSB, stride=stride)
+            fb.buf[:] = ref.buf[:] = bytes(rng.randrange(256) for _ in range(len(fb.buf)))
+            fb.scroll(dx, dy)
+            ref._scroll_pixels(dx, dy)
+            assert fb.buf == ref.buf, (width, stride, dx, dy)
+
+
+def test_image_packed_path_matches_per_pixel_path():
+    Image = pytest.importorskip('PIL.Image')
+    rng = random.Random(7)
+    for rotation, width, stride in ((0, 64, 64), (0, 60, 64), (1, 64, 64), (2, 60, 64), (3, 64, 64)):
+        fb = FrameBuffer(bytearray(stride * 32 // 8), width, 32, MHMSB, stride=stride)
+        ref = FrameBuffer(bytearray(stride * 32 // 8), width, 32, MHMSB, stride=stride)
+        fb.rotation = ref.rotation = rotation
+        size = (32, width) if rotation & 1 else (width, 32)
+        for mode in ('1', 'L'):
+            img = Image.new(mode, size)
+            img.putdata([rng.choice((0, 0, 3, 255)) for _ in range(size[0] * size[1])])
+            fb.buf[:] = bytes(rng.randrange(256) for _ in range(len(fb.buf)))
+            framebuf_host.image(fb, img)
+            ref.image(img)
+            assert fb.buf == ref.buf, (rotation, width, mode)
+
+
+def test_rle_round_trip():
+    rng = random.Random(8)
+    for data in (b'', b'\xff' * 300, bytes([1, 2, 2, 3, 3, 3, 4]) * 50,
+                 bytes(rng.randrange(256) for _ in range(1000))):
+        encoded = rle_encode(data)
+        assert framebuf_host.rle_decode(encoded) == data
+    assert len(rle_encode(b'\xff' * 48000)) == 2 * 48000 // 128
+
+
+def test_print_dump_and_pbm_snapshot_round_trip(tmp_path, capsys):
+    fb = FrameBuffer(bytearray(64 * 32 // 8), 60, 32, MHMSB, stride=64)
+    fb.fill(1)
+    fb.fill_rect(3, 4, 20, 9, 0)
+    fb.print()
+    frames = fb_dump.parse_dumps(capsys.readouterr().out.splitlines())
+    assert len(frames) == 1
+    assert (frames[0].width, frames[0].height, frames[0].stride) == (60, 32, 64)
+    assert frames[0].buf == fb.buf
+    path = str(tmp_path / 'frame.pbm')
+    fb.save_pbm(path)
+    assert fb_dump.diff(fb, fb_dump.load_pbm(path)) == 0
+    assert open(path, 'rb').read(9 + 4 * 8 + 1)[-1] == 0x1F
+
+
+@pytest.mark.parametrize('size', [1, 2])
+def test_bitmap_font_bold_matches_double_draw(size):
+    font = BitmapFont(os.path.join(ROOT, 'font5x8.bin'))
+    fb, ref = make_fb(), make_fb()
+    font.draw_char('W', 3, 2, fb, 1, size, bold=True)
+    font.draw_char('W', 3, 2, ref, 1, size)
+    font.draw_char('W', 4, 2, ref, 1, size)
+    assert fb.buf == ref.buf and any(fb.buf)
+    font.deinit()
+
+
+def test_view_clips_to_its_region_and_shares_dirty_rect():
+    fb = make_fb()
+    fb.fill(0)
+    fb.reset_dirty()
+    view = fb.view(16, 8, 24, 10)
+    view.fill(1)
+    view.fill_rect(-5, 2, 100, 3, 0)
+    view.line(0, 0, 60, 30, 0)
+    ref = make_fb()
+    ref.fill(0)
+    ref.fill_rect(16, 8, 24, 10, 1)
+    ref.fill_rect(16, 10, 24, 3, 0)
+    for i in range(10):
+        ref.pixel(16 + 2 * i, 8 + i, 0)
+        ref.pixel(17 + 2 * i, 8 + i, 0)
+    assert fb.buf == ref.buf
+    assert fb.dirty_rect() == (16, 8, 24, 10)
+    with pytest.raises(ValueError):
+        fb.view(4, 0, 8, 8)
+
+
+def test_view_image_and_print_stay_inside_the_view(capsys):
+    class FakeImage:
+        mode = '1'
+        size = (24, 10)
+
+        def load(self):
+            return {(x, y): (x + y) & 1 for x in range(24) for y in range(10)}
+
+    fb = make_fb()
+    rng = random.Random(7)
+    fb.buf[:] = bytes(rng.randrange(256) for _ in range(len(fb.buf)))
+    before = bytes(fb.buf)
+    view = fb.view(16, 8, 24, 10)
+    assert len(view.buf) == 9 * 8 + 3
+    view.image(FakeImage())
+    for y in range(32):
+        for x in range(64):
+            if not (16 <= x < 40 and 8 <= y < 18):
+                assert fb.pixel(x, y) == (before[y * 8 + x // 8] >> (7 - x % 8)) & 1
+            else:
+                assert fb.pixel(x, y) == (x + y) & 1
+    view.print()
+    frames = fb_dump.parse_dumps(capsys.readouterr().out.splitlines())
+    assert (frames[0].width, frames[0].height, frames[0].stride) == (24, 10, 24)
+    assert all(frames[0].pixel(x, y) == (x + y) & 1 for x in range(24) for y in range(10))
+
+
+def test_text_rejects_lines_and_chars_outside_view(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'config', types.SimpleNamespace(ENABLE_UNIFIED_FONT=False,
+                                                                     UNIFIED_FONT_FILE='unified_font.bin'))
+
+    class CountingFont:
+        font_name = 'font5x8.bin'
+        font_width, font_height = 5, 8
+
+        def __init__(self):
+            self.drawn = []
+
+        def draw_char(self, char, x, y, framebuffer, color, size=1, bold=False):
+            self.drawn.append(char)
+
+    fb = make_fb()
+    font = fb._font = CountingFont()
+    view = fb.view(8, 0, 16, 16)
+    view.text('ab\ncdefghijk\nlmn\nop', 0, -8, 0)
+    assert font.drawn == ['c', 'd', 'e', 'l', 'm', 'n']
+
+
+def reference_line(fb, x_0, y_0, x_1, y_1, color):
+    """改写前的浮点误差 Bresenham"""
+    d_x, d_y = abs(x_1 - x_0), abs(y_1 - y_0)
+    x, y = x_0, y_0
+    s_x = -1 if x_0 > x_1 else 1
+    s_y = -1 if y_0 > y_1 else 1
+    if d_x > d_y:
+        err = d_x / 2.0
+        while x != x_1:
+            fb.pixel(x, y, color)
+            err -= d_y
+            if err < 0:
+                y += s_y
+                err += d_x
+            x += s_x
+    else:
+        err = d_y / 2.0
+        while y != y_1:
+            fb.pixel(x, y, color)
+            err -= d_x
+            if err < 0:
+                x += s_x
+                err += d_y
+            y += s_y
+    fb.pixel(x, y, color)
+
+
+def reference_circle(fb, cx, cy, radius, color):
+    """改写前每步 8 次 pixel() 的中点圆"""
+    x, y, d_x, d_y = radius - 1, 0, 1, 1
+    err = d_x - (radius << 1)
+    while x >= y:
+        for px, py in ((x, y), (y, x), (-y, x), (-x, y), (-x, -y), (-y, -x), (y, -x), (x, -y)):
+            fb.pixel(cx + px, cy + py, color)
+        if err <= 0:
+            y += 1
+            err += d_y
+            d_y += 2
+        if err > 0:
+            x -= 1
+            d_x += 2
+            err += d_x - (radius << 1)
+
+
+@pytest.mark.parametrize('rotation', (0, 1))
+def test_line_and_circle_match_reference(rotation):
+    rng = random.Random(9)
+    fb, ref = make_fb(), make_fb()
+    fb.rotation = ref.rotation = rotation
+    for _ in range(200):
+        pts = [rng.randrange(-10, 74), rng.randrange(-10, 42), rng.randrange(-10, 74), rng.randrange(-10, 42)]
+        if rng.random() < 0.2:
+            pts[3] = pts[1]
+        fb.line(*pts, 1)
+        reference_line(ref, *pts, 1)
+        assert fb.buf == ref.buf, pts
+        c = (rng.randrange(64), rng.randrange(32), rng.randrange(1, 30))
+        fb.circle(*c, 0)
+        reference_circle(ref, *c, 0)
+        assert fb.buf == ref.buf, c
+
+
+def test_filled_shapes_are_solid_spans():
+    for radius in range(1, 15):
+        fb, ref = make_fb(), make_fb()
+        fb.fill_circle(30, 15, radius, 1)
+        reference_circle(ref, 30, 15, radius, 1)
+        for y in range(32):
+            row = [x for x in range(64) if ref.pixel(x, y)]
+            if row:
+                ref.hline(row[0], y, row[-1] - row[0] + 1, 1)
+        assert fb.buf == ref.buf, radius
+    fb = make_fb()
+    fb.round_rect(2, 3, 40, 20, 6, 1, fill=True)
+    outline = make_fb()
+    outline.round_rect(2, 3, 40, 20, 6, 1)
+    assert all(fb.pixel(x, y) for x in range(64) for y in range(32) if outline.pixel(x, y))
+    assert fb.dirty_rect() == outline.dirty_rect() == (2, 3, 40, 20)
+    assert not fb.pixel(2, 3) and fb.pixel(21, 3) and fb.pixel(2, 12)
+
+
+def test_glyph_cache_is_lru_with_stats():
+    cache = GlyphCache(3, slot_size=2)
+    for key in 'abc':
+        cache.put(key, key.encode() * 2)
+    assert bytes(cache.get('a')) == b'aa'
+    cache.put('d', b'dd')  # 淘汰最久未用的 b
+    assert cache.get('b') is None
+    assert bytes(cache.get('c')) == b'cc'
+    cache.put('e', b'ee')  # 淘汰 a
+    assert cache.get('a') is None
+    assert sorted(cache._index) == ['c', 'd', 'e']
+    assert cache.stats() == (3, 3, 2, 2, 2)
+    cache.clear()
+    assert cache.get('c') is None
+    objects = GlyphCache(1)
+    objects.put((1, 2), ('glyph', 16, 16))
+    assert objects.get((1, 2)) == ('glyph', 16, 16)
+
+
+def test_prefetch_resolves_glyphs_in_one_pass():
+    path = os.path.join(ROOT, 'unified_font.bin')
+    glyphs = dict(generate_unified_font.read_font(path)[2])
+    font = UnifiedBitmapFont(path, cache_size=64)
+    text = '今日天气晴，气温 23°C。Hello 世界！\U0001F600'
+    assert font.prefetch(text) == len({c for c in text if font._find_char_offset(ord(c)) is not None})
+    hits = font._cache.hits + font._small.hits
+    for char in text:
+        bitmap = font._load_char(ord(char))
+        if font._find_char_offset(ord(char)) is None:
+            assert bitmap is None
+        else:
+            assert bytes(bitmap) == glyphs[ord(char)]
+    assert font._cache.hits + font._small.hits - hits == sum(1 for c in text if font._find_char_offset(ord(c)) is not None)
+    assert font.prefetch(text) == 0
+    font.deinit()
+
+
+def test_prefetch_never_evicts_cached_glyphs():
+    path = os.path.join(ROOT, 'unified_font.bin')
+    font = UnifiedBitmapFont(path, cache_size=2)
+    font._load_char(ord('今'))
+    assert font.prefetch('天气晴') == 1
+    assert ord('今') in font._cache and len(font._cache) == 2
+    # 缓存已满：不读入也不淘汰
+    assert font.prefetch('多云') == 0
+    assert ord('今') in font._cache and font._cache.evictions == 0
+    font.deinit()
+
+    empty = UnifiedBitmapFont(path, cache_size=0)
+    assert empty.prefetch('今天') == 0
+    assert len(empty._cache) == 0
+    empty.deinit()
+
+
+def test_bucket_lookup_matches_index_scan(tmp_path):
+    path = os.path.join(ROOT, 'unified_font.bin')
+    font = UnifiedBitmapFont(path, cache_size=8)
+    index = {}
+    font._f.seek(font.index_offset)
+    raw = font._f.read(font.char_count * 6)
+    for i in range(font.char_count):
+        code, offset = struct.unpack_from('<HI', raw, i * 6)
+        index[code] = offset
+    rng = random.Random(10)
+    probes = list(range(0, 300)) + [rng.randrange(0x10000) for _ in range(2000)] + rng.sample(sorted(index), 500)
+    for code in probes:
+        assert font._find_char_offset(code) == index.get(code), code
+    assert font._find_char_offset(0x1F600) is None
+    assert 0x1F600 in font._missing
+
+    # 没有分桶表的旧文件：现场扫描生成同样的表
+    old = tmp_path / 'old.bin'
+    with open(path, 'rb') as f:
+        old.write_bytes(f.read()[:-FONT_BUCKET_SIZE])
+    legacy = UnifiedBitmapFont(str(old), cache_size=8)
+    assert legacy._buckets == font._buckets
+    font.deinit()
+    legacy.deinit()
+
+
+def test_glyph_pack_is_used_before_full_font(tmp_path):
+    from tools import subset_font
+    path = os.path.join(ROOT, 'unified_font.bin')
+    pack_path = tmp_path / 'glyphs.bin'
+    _, size, missing = subset_font.subset_font(path, '今日天气晴\U0001F600', str(pack_path))
+    assert missing == ['\U0001F600']
+    assert size == pack_path.stat().st_size
+
+    full = UnifiedBitmapFont(path, cache_size=16)
+    font = UnifiedBitmapFont(path, cache_size=16, pack_name=str(pack_path))
+    assert font._pack.char_count < 200
+    text = '今日天气晴，多云'
+    assert font.prefetch(text) == len(set(text))
+    for char in text + 'A°':
+        assert bytes(font._load_char(ord(char))) == bytes(full._load_char(ord(char))), char
+    # 字形包中没有的字回落到完整字体
+    assert font._pack._find_char_offset(ord('多')) is None
+
+    # 字形包不存在时忽略
+    plain = UnifiedBitmapFont(path, cache_size=16, pack_name=str(tmp_path / 'none.bin'))
+    assert plain._pack is None
+    for f in (full, font, plain):
+        f.deinit()
+
+
+def test_trimmed_font_renders_like_full_bitmaps(tmp_path):
+    path = os.path.join(ROOT, 'unified_font.bin')
+    width, height, glyphs, _ = generate_unified_font.read_font(path)
+    for code, bitmap in glyphs[:200:7] + [(0x2014, glyphs[0][1])]:
+        assert generate_unified_font.untrim_glyph(generate_unified_font.trim_glyph(bitmap)) == bitmap
+    text = 'Hi, j_g. 今日天气—多云°'
+    subset = [(code, bitmap) for code, bitmap in glyphs if chr(code) in text]
+    generate_unified_font.write_font(str(tmp_path / 'v1.bin'), subset, width, height, version=1)
+    v2_size = generate_unified_font.write_font(str(tmp_path / 'v2.bin'), subset, width, height, version=2)
+    assert v2_size < (tmp_path / 'v1.bin').stat().st_size
+
+    frames = []
+    for name in ('v1.bin', 'v2.bin'):
+        fb = make_fb(256, 96)
+        fb.fill(1)
+        font = UnifiedBitmapFont(str(tmp_path / name), cache_size=8)
+        for i, (size, bold) in enumerate(((1, False), (1, True), (2, False), (2, True))):
+            x = 0
+            for char in text[:8]:
+                font.draw_char(char, x - 3, i * 24 - 2, fb, 0, size=size, bold=bold)
+                x += 9 * size
+        frames.append(bytes(fb.buf))
+        font.deinit()
+    assert frames[0] == frames[1] != bytes(b'\xff') * len(frames[0])
+
+
+def test_broken_glyph_pack_is_ignored(tmp_path):
+    path = os.path.join(ROOT, 'unified_font.bin')
+    truncated = tmp_path / 'truncated.bin'
+    truncated.write_bytes(b'GU\x10')
+    bad_magic = tmp_path / 'bad.bin'
+    bad_magic.write_bytes(struct.pack('<4H', 0x1234, 16, 16, 0) + bytes(32))
+    for pack in (truncated, bad_magic):
+        font = UnifiedBitmapFont(path, cache_size=4, pack_name=str(pack))
+        assert font._pack is None
+        assert font._load_char(ord('今')) is not None
+        font.deinit()
+    with pytest.raises(RuntimeError):
+        UnifiedBitmapFont(str(truncated))
+
+
+def test_trimmed_glyphs_use_small_cache_slots():
+    font = UnifiedBitmapFont(os.path.join(ROOT, 'unified_font.bin'), cache_size=8)
+    glyphs = dict(generate_unified_font.read_font(font.font_name)[2])
+    for char in 'a.今':
+        assert bytes(font._load_char(ord(char))) == glyphs[ord(char)]
+    assert ord('a') in font._small and ord('.') in font._small
+    assert ord('今') in font._cache and len(font._cache) == 1
+    bitmap, width, height, dx, dy = font._glyph(ord('.'), 1)
+    assert (width, dx) == (8, 0) and 0 < height < 8 and dy > 0
+    font.deinit()
+
+
+def test_bold_scaled_glyph_caches_only_the_drawn_key():
+    font = UnifiedBitmapFont(os.path.join(ROOT, 'unified_font.bin'), cache_size=8)
+    bitmap, width, height, dx, dy = font._glyph(ord('A'), 2, True)
+    assert len(font._derived) == 1 and (ord('A'), 2, True) in font._derived
+    scaled = font._glyph(ord('A'), 2)
+    assert embolden_bits(scaled[0], scaled[1], scaled[2]) == (bitmap, width, height)
+    assert (dx, dy) == scaled[3:]
+    font.deinit()
+
+
+def test_find_char_offset_reads_only_candidate_entries():
+    class CountingFile:
+        def __init__(self, f):
+            self.f, self.read_sizes = f, []
+
+        def seek(self, pos):
+            return self.f.seek(pos)
+
+        def readinto(self, buf):
+            self.read_sizes.append(len(buf))
+            return self.f.readinto(buf)
+
+    font = UnifiedBitmapFont(os.path.join(ROOT, 'unified_font.bin'), cache_size=8)
+    real = font._f
+    font._f = CountingFile(real)
+    lo, hi = font._candidates(ord('今'))
+    assert font._find_char_offset(ord('今')) is not None
+    assert sum(font._f.read_sizes) <= (hi - lo) * 6
+    font._f = real
+    font.deinit()
@@ -0,0 +1,82 @@
+import struct
+import sys
+import types
+
+import pytest
+
+
+class FakeRTC:
+    """模拟 machine.RTC：memory 在所有实例间共享，相当于深度睡眠后仍保留的 RTC 内存"""
+    data = b''
+
+    def memory(self, data=None):
+        if data is None:
+            return FakeRTC.data
+        FakeRTC.data = bytes(data)
+        return None
+
+
+@pytest.fixture
+def power(monkeypatch):
+    machine = types.ModuleType('machine')
+    machine.RTC = FakeRTC
+    machine.ADC = types.SimpleNamespace(ATTN_11DB=3)  # 模块级默认参数用到
+    monkeypatch.setitem(sys.modules, 'machine', machine)
+    monkeypatch.setitem(sys.modules, 'utime', types.ModuleType('utime'))
+    monkeypatch.delitem(sys.modules, 'system.power', raising=False)
+    FakeRTC.data = b''
+    from system import power
+    yield power
+    sys.modules.pop('system.power', None)
+
+
+def wake(power, **kwargs):
+    """模拟一次唤醒：新建的 RefreshPolicy 从 RTC 内存恢复上次的指纹"""
+    kwargs.setdefault('force_every', 0)
+    kwargs.setdefault('fast_refresh', True)
+    return power.RefreshPolicy(**kwargs)
+
+
+def test_first_wake_is_full(power):
+    assert wake(power).decide(1, 2, 3) == power.RefreshPolicy.FULL
+
+
+def test_decisions_follow_changed_planes(power):
+    policy = wake(power)
+    policy.commit(1, 2, 3, policy.FULL)
+    assert wake(power).decide(1, 2, 3) == policy.SKIP
+    assert wake(power).decide(1, 9, 3) == policy.PARTIAL
+    assert wake(power).decide(7, 2, 3) == policy.FAST
+    assert wake(power).decide(7, 9, 3) == policy.FAST
+    assert wake(power, fast_refresh=False).decide(7, 2, 3) == policy.FULL
+    assert wake(power).decide(1, 2, 8) == policy.FULL
+
+
+def test_full_refresh_forced_every_n_wakes(power):
+    policy = wake(power, force_every=3)
+    policy.commit(1, 2, 3, policy.FULL)
+    for since_full in (1, 2):
+        policy = wake(power, force_every=3)
+        assert policy.decide(1, 2, 3) == policy.SKIP
+        policy.commit(1, 2, 3, policy.SKIP)
+        assert policy.since_full == since_full
+    policy = wake(power, force_every=3)
+    assert policy.decide(1, 2, 3) == policy.FULL
+    policy.commit(1, 2, 3, policy.FULL)
+    assert wake(power, force_every=3).since_full == 0
+
+
+def test_commit_keeps_other_rtc_state(power):
+    FakeRTC.data = struct.pack('II', power.RTC_MAGIC, 41)
+    policy = wake(power)
+    policy.commit(1, 2, 3, policy.FAST)
+    assert struct.unpack('II', FakeRTC.data[:8]) == (power.RTC_MAGIC, 41)
+    assert len(FakeRTC.data) == power.FRAME_STATE_OFFSET + struct.calcsize(power.FRAME_STATE_FORMAT)
+
+
+@pytest.mark.parametrize('data', [b'\x01\x02', bytes(range(40)), b'\xff' * 64])
+def test_cold_or_garbled_rtc_forces_full(power, data):
+    FakeRTC.data = data
+    policy = wake(power)
+    assert policy.last is None
+    assert policy.decide(0, 0, 0) == policy.FULL
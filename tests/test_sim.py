@@ -0,0 +1,39 @@
+from binascii import crc32
+
+from lib import epaper7in5b
+from system import ui
+from tools.epd_sim import make_simulated_epd, render_sample_dashboard
+
+FRAME_BYTES = epaper7in5b.EPD_WIDTH * epaper7in5b.EPD_HEIGHT // 8
+
+# 样例仪表盘（不含随时间变化的状态栏）渲染结果的 CRC，绘制相关优化不应改变画面
+SAMPLE_CONTENT_CRC = 0xF1D3B337
+SAMPLE_YELLOW_CRC = 0x114D3EF7
+
+
+def test_simulator_decodes_layers_and_refresh():
+    epd, panel = make_simulated_epd()
+    black = bytearray(b'\x0f') * FRAME_BYTES
+    epd.display_frame(black, bytearray(b'\xf0') * FRAME_BYTES)
+    assert panel.black == black
+    assert panel.yellow == bytearray(b'\xf0') * FRAME_BYTES
+    assert panel.refreshes == [('full', (0, 0, epd.width, epd.height))]
+    assert panel.command_bytes['DATA_START_TRANSMISSION_1'] == FRAME_BYTES
+
+
+def test_simulator_applies_partial_window():
+    epd, panel = make_simulated_epd()
+    buf = bytearray(FRAME_BYTES)
+    epd.display_window(buf, 16, 10, 8, 2)
+    row = epd.width // 8
+    assert panel.black[10 * row + 2] == 0
+    assert panel.black[10 * row + 3] == 0xFF
+    assert panel.black.count(0) == 2
+    assert not panel.partial
+
+
+def test_sample_dashboard_render_is_stable():
+    _, panel = render_sample_dashboard()
+    assert crc32(bytes(panel.black[:ui.STATUS_Y * epaper7in5b.EPD_WIDTH // 8])) == SAMPLE_CONTENT_CRC
+    assert crc32(bytes(panel.yellow)) == SAMPLE_YELLOW_CRC
+    assert panel.to_image().size == (epaper7in5b.EPD_WIDTH, epaper7in5b.EPD_HEIGHT)
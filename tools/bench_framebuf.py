@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+帧缓冲绘制性能基准（主机侧）
+
+对比逐像素参考实现与 lib/framebuf2 当前实现的耗时，输出优化前后的对照。
+
+用法:
+    python3 tools/bench_framebuf.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from lib.framebuf2 import FrameBuffer, MHMSB, MHMSBFormat, UnifiedBitmapFont  # noqa: E402
+from tools import framebuf_host  # noqa: E402
+
+WIDTH = 800
+HEIGHT = 480
+FONT_FILE = os.path.join(ROOT, 'unified_font.bin')
+
+
+def make_fb():
+    return FrameBuffer(bytearray(WIDTH * HEIGHT // 8), WIDTH, HEIGHT, MHMSB)
+
+
+def timeit(fn, repeat=3):
+    """返回多次运行中最快一次的毫秒数"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def reference_fill_rect(framebuf, x, y, width, height, color):
+    """优化前的实现：按列逐像素读改写"""
+    for _x in range(x, x + width):
+        offset = 7 - _x & 0x07
+        for _y in range(y, y + height):
+            index = (_y * framebuf.stride + _x) // 8
+            framebuf.buf[index] = (framebuf.buf[index] & ~(0x01 << offset)) | ((color != 0) << offset)
+
+
+def bench_fill_rect():
+    cases = [
+        ('full screen', (0, 0, WIDTH, HEIGHT)),
+        ('400x200 unaligned', (13, 40, 400, 200)),
+        ('thick rule 760x2', (20, 65, 760, 2)),
+        ('vline 1x480', (399, 0, 1, HEIGHT)),
+    ]
+    fb = make_fb()
+    for name, (x, y, w, h) in cases:
+        before = timeit(lambda: reference_fill_rect(fb, x, y, w, h, 0), repeat=1)
+        after = timeit(lambda: MHMSBFormat.fill_rect(fb, x, y, w, h, 0))
+        yield f'fill_rect {name}', before, after
+
+
+def reference_draw_char(self, char, x, y, framebuffer, color, size=1, bold=False):
+    """优化前的 UnifiedBitmapFont.draw_char：每个置位像素一次 fill_rect，加粗靠偏移 1 像素再画一遍"""
+    # pylint: disable=too-many-arguments
+    if bold:
+        reference_draw_char(self, char, x + 1, y, framebuffer, color, size)
+    size = max(size, 1)
+    bitmap = self._load_char(ord(char))
+    if bitmap is None:
+        return
+    for row in range(self.font_height):
+        for col_byte in range(self.font_width // 8):
+            byte_val = bitmap[row * (self.font_width // 8) + col_byte]
+            for bit in range(8):
+                if byte_val & (1 << (7 - bit)):
+                    framebuffer.fill_rect(x + (col_byte * 8 + bit) * size, y + row * size, size, size, color)
+
+
+def render_dashboard():
+    """用样例内容完整绘制一次仪表盘（假 SPI，不计面板刷新）"""
+    from system import ui
+    from tools.epd_sim import SAMPLE_INFO1, SAMPLE_INFO2, SAMPLE_SENSORS, in_root, make_epd
+    epd = make_epd()
+    epd._inited = True  # 跳过复位等待
+    buf = bytearray(WIDTH * HEIGHT // 8)
+    with contextlib.redirect_stdout(io.StringIO()), in_root():
+        ui.draw_dashboard(epd, buf, (SAMPLE_INFO1, None), (SAMPLE_INFO2, None), SAMPLE_SENSORS)
+
+
+@contextlib.contextmanager
+def patched(cls, name, value):
+    original = getattr(cls, name)
+    setattr(cls, name, value)
+    try:
+        yield
+    finally:
+        setattr(cls, name, original)
+
+
+def bench_dashboard():
+    with patched(UnifiedBitmapFont, 'draw_char', reference_draw_char):
+        before = timeit(render_dashboard, repeat=1)
+    after = timeit(render_dashboard)
+    yield 'sample dashboard render', before, after
+
+
+def bench_title():
+    """size=2 标题：逐位 fill_rect 对比查表放大 + 缓存"""
+    font = UnifiedBitmapFont(FONT_FILE)
+    fb = make_fb()
+    title = '今日天气 Weather 23°C'
+
+    def draw(draw_char):
+        x = 0
+        for ch in title:
+            draw_char(font, ch, x, 0, fb, 0, size=2)
+            x += 32
+
+    before = timeit(lambda: draw(reference_draw_char), repeat=1)
+    after = timeit(lambda: draw(UnifiedBitmapFont.draw_char))
+    font.deinit()
+    yield 'size=2 title', before, after
+
+
+def bench_prefetch():
+    """样例两栏正文的字形：逐字二分查找 vs prefetch 一次归并（统计文件 seek 次数）"""
+    from tools.epd_sim import SAMPLE_INFO1, SAMPLE_INFO2
+    text = SAMPLE_INFO1 + SAMPLE_INFO2
+
+    def load(batch):
+        font = UnifiedBitmapFont(FONT_FILE, cache_size=400)
+        seeks = [0]
+        seek = font._f.seek
+
+        def counting_seek(*args):
+            seeks[0] += 1
+            return seek(*args)
+
+        font._f = type('F', (), {'seek': staticmethod(counting_seek), 'read': font._f.read,
+                                 'readinto': font._f.readinto})()
+        if batch:
+            font.prefetch(text)
+        for char in text:
+            font._load_char(ord(char))
+        return seeks[0]
+
+    before = timeit(lambda: load(False))
+    after = timeit(lambda: load(True))
+    yield f'glyph loading ({load(False)} -> {load(True)} seeks)', before, after
+
+
+def bench_scroll():
+    fb = make_fb()
+    for name, (dx, dy) in (('up 16 rows', (0, -16)), ('left 4 px', (-4, 0))):
+        before = timeit(lambda: fb._scroll_pixels(dx, dy), repeat=1)
+        after = timeit(lambda: fb.scroll(dx, dy))
+        yield f'scroll {name}', before, after
+
+
+def bench_shapes():
+    sys.path.insert(0, os.path.join(ROOT, 'tests'))
+    from test_framebuf import reference_circle, reference_line
+    fb = make_fb()
+
+    def lines(draw):
+        for i in range(0, HEIGHT, 8):
+            draw(fb, 0, i, WIDTH - 1, HEIGHT - 1 - i, 0)
+        draw(fb, 20, 65, 380, 65, 0)
+
+    yield 'lines x61', timeit(lambda: lines(reference_line), repeat=1), timeit(lambda: lines(FrameBuffer.line))
+    before = timeit(lambda: reference_circle(fb, 400, 240, 200, 0), repeat=1)
+    yield 'circle r=200', before, timeit(lambda: fb.circle(400, 240, 200, 0))
+
+
+def bench_image():
+    try:
+        from PIL import Image
+    except ImportError:
+        return
+    img = Image.effect_noise((WIDTH, HEIGHT), 64).convert('1')
+    fb = make_fb()
+    before = timeit(lambda: fb.image(img), repeat=1)
+    after = timeit(lambda: framebuf_host.image(fb, img))
+    yield 'image 800x480 mode 1', before, after
+
+
+BENCHMARKS = [bench_fill_rect, bench_dashboard, bench_title, bench_prefetch, bench_scroll, bench_shapes, bench_image]
+
+
+def main():
+    print(f"{'benchmark':<36}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for bench in BENCHMARKS:
+        for name, before, after in bench():
+            print(f"{name:<36}{before:>12.2f}{after:>12.2f}{before / max(after, 1e-6):>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
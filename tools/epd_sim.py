@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+墨水屏主机侧模拟工具
+
+提供假的 machine.Pin / machine.SPI，用于在没有 ESP32 的情况下驱动
+lib/epaper7in5b.EPD：
+- FakeSPI 只统计 SPI 事务数与字节数，衡量驱动层优化效果
+- SimulatedPanel 按 DC 电平解析命令/数据字节流，还原黑/黄平面，
+  统计每条命令的次数与字节数，按时序模型估算刷新耗时，并输出合成 PNG
+
+用法:
+    python3 tools/epd_sim.py --bench
+    python3 tools/epd_sim.py --out frame.png
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from lib import epaper7in5b  # noqa: E402
+
+COMMAND_NAMES = {}
+for _name in ('PANEL_SETTING', 'POWER_SETTING', 'POWER_OFF', 'POWER_ON', 'BOOSTER_SOFT_START', 'DEEP_SLEEP',
+              'DATA_START_TRANSMISSION_1', 'DATA_STOP', 'DISPLAY_REFRESH', 'DATA_START_TRANSMISSION_2',
+              'LUT_FOR_VCOM', 'LUT_BLUE', 'LUT_WHITE', 'LUT_GRAY_1', 'LUT_GRAY_2', 'PLL_CONTROL',
+              'TEMPERATURE_CALIBRATION', 'VCOM_AND_DATA_INTERVAL_SETTING', 'TCON_SETTING', 'TCON_RESOLUTION',
+              'VCM_DC_SETTING', 'FLASH_MODE', 'PARTIAL_WINDOW', 'PARTIAL_IN', 'PARTIAL_OUT'):
+    COMMAND_NAMES[getattr(epaper7in5b, _name)] = _name
+
+# 时序模型（毫秒）：三色全刷 / 黑白快刷的刷新时长，复位时长，以及 SPI 波特率
+REFRESH_MS = {'full': 15000, 'fast': 1500}
+RESET_MS = 400
+SPI_BAUDRATE = 20000000
+
+SAMPLE_INFO1 = """# 今日要闻
+## 全球资讯
+- 空间站补给任务圆满完成
+- 新技术突破提升电池效率
+- 国际气候峰会今日开幕
+
+## 当地天气
+气温: 22°C / 15°C
+天气: 多云转晴
+风力: 东北风 2 级
+
+## 提醒事项
+下午 3 点 团队周会
+记得给阳光房通风"""
+
+SAMPLE_INFO2 = """# 个人看板
+## 项目进度
+- 墨水屏固件: 90% (优化中)
+- 自动化录音机: 已上线
+- 知识库维护: 进行中
+
+## 每日格言
+
+Stay hungry, stay foolish.  The best way to predict the future is to create it.
+
+## 加密货币
+BTC: $51,234.56 (-1.2%)
+ETH: $2,987.12 (+0.5%)"""
+
+SAMPLE_SENSORS = {'temp': 22.5, 'humi': 43.0, 'bat_v': 7.2, 'bat_raw': 1.8, 'bat_p': 50.0}
+
+
+class FakePin:
+    """模拟 machine.Pin，记录输出电平"""
+    IN = 1
+    OUT = 3
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+    WAKE_LOW = 4
+    WAKE_HIGH = 5
+
+    def __init__(self, level=1):
+        self.level = level
+        self.mode = None
+        self.handler = None
+        self.wake = None
+
+    def irq(self, handler=None, trigger=IRQ_RISING, wake=None):
+        self.handler = handler
+        self.wake = (trigger, wake) if wake else None
+
+    def init(self, mode, value=None):
+        self.mode = mode
+        if value is not None:
+            self.level = value
+
+    def value(self, v=None):
+        if v is None:
+            return self.level
+        self.level = v
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+
+class FakeBusyPin(FakePin):
+    """模拟 BUSY 引脚：busy_for(ms) 期间保持低电平，到时翻转为高电平"""
+
+    def __init__(self):
+        super().__init__(level=1)
+        self._deadline = None
+
+    def busy_for(self, ms):
+        self.level = epaper7in5b.BUSY
+        self._deadline = time.monotonic() + ms / 1000
+
+    def value(self, v=None):
+        if v is None and self._deadline is not None and time.monotonic() >= self._deadline:
+            self._deadline = None
+            self.level = 1
+        return super().value(v)
+
+
+class FakeSPI:
+    """模拟 machine.SPI，统计事务数与传输字节数"""
+
+    def __init__(self):
+        self.transactions = 0
+        self.bytes = 0
+
+    def write(self, data):
+        self.transactions += 1
+        self.bytes += len(data)
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes = 0
+
+
+class SimulatedPanel:
+    """
+    GDEY075Z08 控制器的主机侧模型：按 DC 电平把 SPI 字节流拆成命令和数据，
+    维护两块显存（DTM1/DTM2）和屏幕上实际显示的黑/黄平面。
+    """
+
+    def __init__(self):
+        self.width = epaper7in5b.EPD_WIDTH
+        self.height = epaper7in5b.EPD_HEIGHT
+        self.cs = FakePin()
+        self.dc = FakePin()
+        self.rst = FakePin()
+        self.busy = FakeBusyPin()
+        self.spi = FakeSPI()
+        self.spi.write = self._write
+        self.command_counts = {}
+        self.command_bytes = {}
+        self.refreshes = []  # 每次刷新的 (模式名, 窗口)
+        self.bytes = 0
+        self.fast = False
+        self.partial = False
+        self.window = None
+        self._command = None
+        self._params = bytearray()
+        self._cursor = 0
+        self._resize()
+
+    def _resize(self):
+        n = self.width * self.height // 8
+        self.ram = {1: bytearray(b'\xff') * n, 2: bytearray(b'\xff') * n}
+        self.black = bytearray(b'\xff') * n
+        self.yellow = bytearray(b'\xff') * n
+
+    def _write(self, data):
+        data = bytes(data)
+        self.bytes += len(data)
+        if self.dc.value() == 0:
+            for command in data:
+                self._on_command(command)
+        else:
+            self._on_data(data)
+
+    def _on_command(self, command):
+        self._flush_params()
+        name = COMMAND_NAMES.get(command, f'0x{command:02X}')
+        self.command_counts[name] = self.command_counts.get(name, 0) + 1
+        self.command_bytes.setdefault(name, 0)
+        self._command = command
+        self._cursor = 0
+        if command == epaper7in5b.PARTIAL_IN:
+            self.partial = True
+        elif command == epaper7in5b.PARTIAL_OUT:
+            self.partial = False
+        elif command == epaper7in5b.DISPLAY_REFRESH:
+            self._refresh()
+
+    def _on_data(self, data):
+        name = COMMAND_NAMES.get(self._command, f'0x{self._command:02X}')
+        self.command_bytes[name] = self.command_bytes.get(name, 0) + len(data)
+        if self._command == epaper7in5b.DATA_START_TRANSMISSION_1:
+            self._store(1, data)
+        elif self._command == epaper7in5b.DATA_START_TRANSMISSION_2:
+            self._store(2, data)
+        else:
+            self._params += data
+
+    def _region(self):
+        if self.partial and self.window:
+            return self.window
+        return 0, 0, self.width, self.height
+
+    def _store(self, ram, data):
+        """按当前窗口把数据流依次写入显存的行片段"""
+        x0, y0, x1, y1 = self._region()
+        row = self.width // 8
+        span = (x1 - x0) // 8
+        buf = self.ram[ram]
+        for b in data:
+            y = y0 + self._cursor // span
+            if y < y1:
+                buf[y * row + x0 // 8 + self._cursor % span] = b
+            self._cursor += 1
+
+    def _flush_params(self):
+        p = self._params
+        if self._command == epaper7in5b.TCON_RESOLUTION and len(p) >= 4:
+            width, height = (p[0] << 8) | p[1], (p[2] << 8) | p[3]
+            if (width, height) != (self.width, self.height):
+                self.width, self.height = width, height
+                self._resize()
+        elif self._command == epaper7in5b.PANEL_SETTING and p:
+            self.fast = bool(p[0] & 0x10)
+        elif self._command == epaper7in5b.PARTIAL_WINDOW and len(p) >= 8:
+            x0, x1 = (p[0] << 8) | p[1], (p[2] << 8) | p[3]
+            y0, y1 = (p[4] << 8) | p[5], (p[6] << 8) | p[7]
+            self.window = (x0 & ~7, y0, (x1 | 7) + 1, y1 + 1)
+        self._params = bytearray()
+
+    def _refresh(self):
+        """把显存内容按当前模式“刷”到屏幕：KWR 模式 DTM1=黑、DTM2=黄；KW 快刷模式 DTM2=黑，黄色不动"""
+        x0, y0, x1, y1 = self._region()
+        row = self.width // 8
+        for y in range(y0, y1):
+            a, b = y * row + x0 // 8, y * row + x1 // 8
+            if self.fast:
+                self.black[a:b] = self.ram[2][a:b]
+            else:
+                self.black[a:b] = self.ram[1][a:b]
+                self.yellow[a:b] = self.ram[2][a:b]
+        self.refreshes.append(('fast' if self.fast else 'full', self._region()))
+
+    def simulated_ms(self):
+        """按时序模型估算的总耗时：SPI 传输 + 复位 + 各次刷新"""
+        spi_ms = self.bytes * 8 * 1000 // SPI_BAUDRATE
+        refresh_ms = sum(REFRESH_MS[mode] for mode, _ in self.refreshes)
+        return spi_ms + RESET_MS + refresh_ms
+
+    def to_image(self):
+        """合成黑/黄/白三色图像（需要 Pillow），黄色优先于黑色"""
+        from PIL import Image
+        size = (self.width, self.height)
+        black = Image.frombytes('1', size, bytes(self.black))
+        yellow = Image.frombytes('1', size, bytes(self.yellow))
+        img = Image.new('RGB', size, (255, 255, 255))
+        img.paste((0, 0, 0), mask=black.point(lambda p: 255 - p))
+        img.paste((230, 190, 0), mask=yellow.point(lambda p: 255 - p))
+        return img
+
+    def report(self):
+        lines = [f"{'command':<32}{'count':>7}{'bytes':>10}"]
+        for name in sorted(self.command_counts, key=lambda n: -self.command_bytes.get(n, 0)):
+            lines.append(f"{name:<32}{self.command_counts[name]:>7}{self.command_bytes.get(name, 0):>10}")
+        lines.append(f"refreshes: {[mode for mode, _ in self.refreshes]}")
+        lines.append(f"SPI bytes: {self.bytes}, simulated time: {self.simulated_ms()} ms")
+        return "\n".join(lines)
+
+
+def make_epd(spi=None, busy=None, **kwargs):
+    """构造一个挂在假 SPI/Pin 上的 EPD 实例"""
+    spi = spi or FakeSPI()
+    busy = busy or FakeBusyPin()
+    return epaper7in5b.EPD(spi, FakePin(), FakePin(), FakePin(), busy, **kwargs)
+
+
+def make_simulated_epd(**kwargs):
+    """构造一个接在 SimulatedPanel 上的 EPD 实例，返回 (epd, panel)"""
+    panel = SimulatedPanel()
+    epd = epaper7in5b.EPD(panel.spi, panel.cs, panel.dc, panel.rst, panel.busy, **kwargs)
+    return epd, panel
+
+
+@contextlib.contextmanager
+def in_root():
+    """临时切换到仓库根目录（config 中的字体文件是相对路径），退出时恢复原工作目录"""
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def render_sample_dashboard(info1=SAMPLE_INFO1, info2=SAMPLE_INFO2, sensors=SAMPLE_SENSORS, policy=None):
+    """在模拟面板上完整绘制一次仪表盘，返回 (epd, panel)"""
+    from system import ui
+    epd, panel = make_simulated_epd()
+    buf = bytearray(epd.width * epd.height // 8)
+    epd.clear_frame(buf)
+    with in_root():
+        ui.draw_dashboard(epd, buf, (info1, None), (info2, None), sensors, policy=policy)
+    return epd, panel
+
+
+def bench_write_buffer(chunk_size=epaper7in5b.CHUNK_SIZE):
+    """统计上传一个完整图层的 SPI 事务数、字节数和主机耗时"""
+    epd = make_epd(chunk_size=chunk_size)
+    buf = bytearray(b'\xff') * (epd.width * epd.height // 8)
+    epd.spi.reset()
+    start = time.perf_counter()
+    epd.write_buffer(buf)
+    elapsed = time.perf_counter() - start
+    return epd.spi.transactions, epd.spi.bytes, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='E-paper dashboard host simulator')
+    parser.add_argument('--out', help='write the composited frame to this PNG file')
+    parser.add_argument('--bench', action='store_true', help='benchmark layer upload chunk sizes')
+    args = parser.parse_args()
+
+    if args.bench:
+        for size in (1, 512, epaper7in5b.CHUNK_SIZE, 48000):
+            n, total, elapsed = bench_write_buffer(size)
+            print(f"chunk={size:>5}: {n:>6} transactions, {total} bytes, {elapsed * 1000:.2f} ms")
+        return
+
+    out = os.path.abspath(args.out) if args.out else None
+    start = time.perf_counter()
+    _, panel = render_sample_dashboard()
+    print(f"host render time: {(time.perf_counter() - start) * 1000:.0f} ms")
+    print(panel.report())
+    if out:
+        panel.to_image().save(out)
+        print(f"frame written to {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+帧缓冲串口转储还原工具（主机侧）
+
+设备上调用 FrameBuffer.print()（或 debug.test_display(dump=True)）会在 REPL 输出
+``FRAMEBUF <width> <height> <stride>`` ... ``END FRAMEBUF`` 块，中间每行是一段
+PackBits RLE 编码后的 base64。把串口日志保存下来，用本工具还原成 PBM/PNG，
+或与另一帧逐字节比较。
+
+用法:
+    python3 tools/fb_dump.py serial.log -o frame.png
+    python3 tools/fb_dump.py serial.log --diff expected.pbm
+"""
+
+import argparse
+import binascii
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from lib.framebuf2 import FrameBuffer, MHMSB  # noqa: E402
+from tools.framebuf_host import rle_decode, save_png  # noqa: E402
+
+
+def parse_dumps(lines):
+    """从日志行中解析出所有转储块，依次返回 FrameBuffer"""
+    frames = []
+    header = None
+    buf = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith('FRAMEBUF '):
+            header = [int(v) for v in line.split()[1:4]]
+            buf = bytearray()
+        elif line == 'END FRAMEBUF' and header:
+            width, height, stride = header
+            size = (stride * height + 7) // 8
+            if len(buf) != size:
+                raise ValueError(f'frame {len(frames)}: decoded {len(buf)} bytes, expected {size}')
+            frames.append(FrameBuffer(buf, width, height, MHMSB, stride=stride))
+            header = None
+        elif header and line:
+            rle_decode(binascii.a2b_base64(line), buf)
+    return frames
+
+
+def load_pbm(path):
+    """读取 P4 文件为 FrameBuffer（反转回缓冲区约定：1 为白）"""
+    from lib.framebuf2 import BitmapFile
+    with BitmapFile(path) as bitmap:
+        fb = FrameBuffer(bytearray(bitmap.row_bytes * bitmap.height), bitmap.row_bytes * 8, bitmap.height, MHMSB)
+        fb.width = bitmap.width
+        row = bytearray(bitmap.row_bytes)
+        for y in range(bitmap.height):
+            bitmap.readrow(y, row)
+            fb.buf[y * bitmap.row_bytes:(y + 1) * bitmap.row_bytes] = row
+    return fb
+
+
+def diff(a, b):
+    """返回两帧中不同像素的数量"""
+    if (a.width, a.height) != (b.width, b.height):
+        raise ValueError(f'size mismatch: {a.width}x{a.height} vs {b.width}x{b.height}')
+    return sum(1 for y in range(a.height) for x in range(a.width) if a.pixel(x, y) != b.pixel(x, y))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('log', help='保存的串口日志')
+    parser.add_argument('-o', '--out', help='输出文件（.pbm 或 .png），多帧时自动加序号')
+    parser.add_argument('--diff', help='与该 PBM 比较')
+    args = parser.parse_args()
+
+    with open(args.log, encoding='utf-8', errors='replace') as f:
+        frames = parse_dumps(f)
+    if not frames:
+        sys.exit('no FRAMEBUF dump found')
+    for i, fb in enumerate(frames):
+        print(f'frame {i}: {fb.width}x{fb.height}')
+        if args.out:
+            root, ext = os.path.splitext(args.out)
+            path = args.out if len(frames) == 1 else f'{root}-{i}{ext}'
+            if ext.lower() == '.png':
+                save_png(fb, path)
+            else:
+                fb.save_pbm(path)
+            print(f'  saved {path}')
+        if args.diff:
+            print(f'  {diff(fb, load_pbm(args.diff))} pixels differ from {args.diff}')
+
+
+if __name__ == '__main__':
+    main()
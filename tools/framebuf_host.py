@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+帧缓冲的主机侧辅助函数
+
+只在 PC 上用到（依赖 PIL 等）的代码放在这里，不放进 lib/framebuf2.py，
+免得设备端编译和加载用不到的字节码。
+"""
+
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+# 各旋转方向下把逻辑坐标系中的图像转回缓冲区方向的 PIL Image.transpose() 方法
+# （ROTATE_90, ROTATE_180, ROTATE_270）
+IMAGE_TRANSPOSE = (None, 4, 3, 2)
+
+
+def image(fb, img):
+    """
+    FrameBuffer.image() 的快速路径：先按旋转把图像转成缓冲区方向，
+    再用 tobytes() 取 1 位打包行（MSB 在左，非零为 1，与缓冲区一致）整行写入。
+    不支持的模式或缓冲区退回 fb.image() 的逐像素路径。
+    """
+    width, height = fb.width, fb.height
+    if fb.rotation in (1, 3):
+        width, height = height, width
+    if img.size != (width, height):
+        raise ValueError("Image must be same dimensions as display ({0}x{1}).".format(width, height))
+    if img.mode not in ("1", "L") or fb.stride & 0x07:
+        fb.image(img)
+        return
+    if img.mode == "L":
+        # 与逐像素路径一致：任何非零灰度都算 1（convert("1") 会做抖动，不能用）
+        img = img.point(lambda v: 255 if v else 0, "1")
+    if fb.rotation:
+        img = img.transpose(IMAGE_TRANSPOSE[fb.rotation])
+    data = img.tobytes()
+    n = (fb.width + 7) >> 3
+    row = fb.stride >> 3
+    buf = fb.buf
+    if n == row and fb._parent is None:
+        buf[:len(data)] = data
+        buf[len(data):] = bytes(len(buf) - len(data))
+    else:
+        if fb._parent is None:
+            buf[:] = bytes(len(buf))
+        for y in range(fb.height):
+            buf[y * row:y * row + n] = data[y * n:(y + 1) * n]
+    fb._mark(0, 0, fb.width - 1, fb.height - 1)
+
+
+def save_png(fb, path):
+    """用 PIL 把缓冲区（未旋转的原始方向）存为 PNG（白=1，与面板显示一致）"""
+    from PIL import Image
+
+    if fb.stride & 0x07:
+        raise ValueError("save_png needs a byte-aligned stride")
+    n = (fb.width + 7) >> 3
+    row = fb.stride >> 3
+    data = bytes(fb.buf) if n == row else b"".join(
+        bytes(fb.buf[y * row:y * row + n]) for y in range(fb.height))
+    Image.frombytes("1", (fb.width, fb.height), data).save(path)
+
+
+def rle_decode(data, out=None):
+    """FrameBuffer.print() 所用 PackBits（framebuf2.rle_encode）的解码，结果追加到 out（默认新建 bytearray）并返回"""
+    if out is None:
+        out = bytearray()
+    n = len(data)
+    i = 0
+    while i < n:
+        h = data[i]
+        i += 1
+        if h < 128:
+            out += data[i:i + h + 1]
+            i += h + 1
+        elif h > 128:
+            out += bytes((data[i],)) * (257 - h)
+            i += 1
+    return out
+
+
+def frame_buffer(epd, pixels):
+    """
+    EPD.get_frame_buffer() 的 NumPy 版本：整幅灰度图一次阈值 + packbits，
+    返回 (buf_black, buf_yellow)。没有 NumPy 时退回逐行打包。
+    """
+    try:
+        import numpy
+    except ImportError:
+        return epd.get_frame_buffer(pixels)
+    if hasattr(pixels, 'convert'):
+        pixels = pixels.convert('L').tobytes()
+    if not isinstance(pixels, (bytes, bytearray, memoryview)):
+        return epd.get_frame_buffer(pixels)
+    b0, b1 = epd.yellow_bounds
+    a = numpy.frombuffer(pixels, dtype=numpy.uint8).reshape(epd.height, epd.width)
+    buf_black = numpy.packbits(a >= b0, axis=1)
+    buf_yellow = numpy.packbits((a < b0) | (a >= b1), axis=1)
+    return bytearray(buf_black.tobytes()), bytearray(buf_yellow.tobytes())
@@ -5,18 +5,36 @@
 生成包含 ASCII + 中文的 16×16 位图字体文件
 - ASCII: 32-126 (95 个字符)
 - 中文: CJK 统一汉字 (约 20902 个字符)
-- 总计: 约 2.1w 字符，约 780KB
+- 总计: 约 2.1w 字符
+- 格式 v2（默认）：裁剪后更小的字形只存边框内的行和字节（前加 3 字节边框头，
+  索引偏移最高位置 1），其余字形与 v1 一样存定长 32 字节位图
+
+用法:
+    python3 tools/generate_unified_font.py                      # 生成 v2 字体
+    python3 tools/generate_unified_font.py --v1                 # 生成 v1 字体
+    python3 tools/generate_unified_font.py --convert [src] [dst]  # v1/v2 互转并对比大小和解码耗时
+    python3 tools/generate_unified_font.py --buckets [path]     # 给旧文件补分桶表
 """
 
 import struct
 import os
 import sys
-from PIL import Image, ImageDraw, ImageFont
+import time
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # 只做格式转换时不需要 PIL
+    Image = ImageDraw = ImageFont = None
 
 
 FONT_WIDTH = 16
 FONT_HEIGHT = 16
 MAGIC_NUMBER = 0x5546
+MAGIC_NUMBER_V2 = 0x5547
+GLYPH_HEADER = 3
+GLYPH_TRIMMED = 0x80000000
+# 文件末尾的分桶表：257 个 uint16（各高字节在索引中的起始下标，最后一个为字符总数）+ 标记
+BUCKET_TAG = b'UFB1'
 
 ASCII_START = 32
 ASCII_END = 126
@@ -113,7 +131,137 @@ def get_common_chinese_chars():
     return sorted(list(chars_set))
 
 
-def generate_unified_font(output_path):
+def trim_glyph(bitmap, width=FONT_WIDTH, height=FONT_HEIGHT):
+    """
+    把完整位图编码为 v2 字形：边框头 (首个非空行, 行数, 首个非空列字节 << 4 | 每行字节数)
+    + 边框内的行。空白字形（如空格）只有 3 字节头
+    """
+    row_bytes = (width + 7) // 8
+    rows = [bitmap[r * row_bytes:(r + 1) * row_bytes] for r in range(height)]
+    used = [r for r in range(height) if any(rows[r])]
+    if not used:
+        return bytes(GLYPH_HEADER)
+    top, bottom = used[0], used[-1] + 1
+    cols = [j for j in range(row_bytes) if any(rows[r][j] for r in used)]
+    first, last = cols[0], cols[-1] + 1
+    out = bytearray([top, bottom - top, first << 4 | (last - first)])
+    for r in range(top, bottom):
+        out += rows[r][first:last]
+    return bytes(out)
+
+
+def untrim_glyph(data, width=FONT_WIDTH, height=FONT_HEIGHT):
+    """trim_glyph 的逆过程，返回完整位图"""
+    row_bytes = (width + 7) // 8
+    top, nrows, cols = data[0], data[1], data[2]
+    first, n = cols >> 4, cols & 0x0F
+    out = bytearray(row_bytes * height)
+    for r in range(nrows):
+        src = GLYPH_HEADER + r * n
+        dst = (top + r) * row_bytes + first
+        out[dst:dst + n] = data[src:src + n]
+    return bytes(out)
+
+
+def write_font(path, glyphs, width=FONT_WIDTH, height=FONT_HEIGHT, version=2):
+    """
+    把 [(编码, 完整位图)]（按编码排序）写成统一字体文件，末尾附分桶表。
+    v2 只在裁剪后确实更小时才存裁剪形式，所以文件不会比 v1 大
+    """
+    blobs = []
+    for _, bitmap in glyphs:
+        trimmed = trim_glyph(bitmap, width, height) if version == 2 else bitmap
+        blobs.append(trimmed if len(trimmed) < len(bitmap) else bitmap)
+    magic = MAGIC_NUMBER_V2 if version == 2 else MAGIC_NUMBER
+    out = bytearray(struct.pack('<4H', magic, width, height, len(glyphs)))
+    offset = 8 + len(glyphs) * 6
+    for (code, bitmap), blob in zip(glyphs, blobs):
+        out += struct.pack('<HI', code, offset | (GLYPH_TRIMMED if blob is not bitmap else 0))
+        offset += len(blob)
+    for blob in blobs:
+        out += blob
+    out += build_buckets([code for code, _ in glyphs])
+    with open(path, 'wb') as f:
+        f.write(out)
+    return len(out)
+
+
+def read_font(path):
+    """读取 v1/v2 统一字体文件，返回 (宽, 高, [(编码, 完整位图)], 版本)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, width, height, count = struct.unpack_from('<4H', data)
+    if magic not in (MAGIC_NUMBER, MAGIC_NUMBER_V2):
+        raise RuntimeError(f'{path} 不是统一字体文件')
+    size = (width + 7) // 8 * height
+    glyphs = []
+    for i in range(count):
+        code, offset = struct.unpack_from('<HI', data, 8 + i * 6)
+        if offset & GLYPH_TRIMMED:
+            offset &= ~GLYPH_TRIMMED
+            bitmap = untrim_glyph(data[offset:offset + GLYPH_HEADER + size], width, height)
+        else:
+            bitmap = data[offset:offset + size]
+        glyphs.append((code, bitmap))
+    return width, height, glyphs, 2 if magic == MAGIC_NUMBER_V2 else 1
+
+
+def time_decode(path, codes):
+    """用设备同款 UnifiedBitmapFont 逐个取出 codes 绘制用的字形（即 draw_char 的读取部分），返回毫秒数"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from lib.framebuf2 import UnifiedBitmapFont
+    font = UnifiedBitmapFont(path, cache_size=64)
+    start = time.perf_counter()
+    for code in codes:
+        font._glyph(code, 1)
+    elapsed = (time.perf_counter() - start) * 1000
+    font.deinit()
+    return elapsed
+
+
+def convert_font(src, dst):
+    """把 src 转成另一种版本写到 dst，并对比两者的文件大小和全量解码耗时"""
+    width, height, glyphs, version = read_font(src)
+    target = 1 if version == 2 else 2
+    write_font(dst, glyphs, width, height, version=target)
+    codes = [code for code, _ in glyphs]
+    print(f"✓ v{version} -> v{target}: {dst}（{len(glyphs)} 个字形）")
+    for path, v in ((src, version), (dst, target)):
+        print(f"  v{v}: {os.path.getsize(path) / 1024:8.1f} KB, "
+              f"解码全部字形 {time_decode(path, codes):8.1f} ms")
+
+
+def build_buckets(codes):
+    """按编码高字节生成分桶表（codes 须已排序）"""
+    buckets = []
+    i = 0
+    for high in range(256):
+        while i < len(codes) and codes[i] >> 8 < high:
+            i += 1
+        buckets.append(i)
+    buckets.append(len(codes))
+    return struct.pack('<257H', *buckets) + BUCKET_TAG
+
+
+def append_buckets(path):
+    """给已有的字体文件追加分桶表（已有则跳过）"""
+    with open(path, 'r+b') as f:
+        f.seek(-len(BUCKET_TAG), 2)
+        if f.read(len(BUCKET_TAG)) == BUCKET_TAG:
+            print(f"{path} 已包含分桶表")
+            return
+        f.seek(0)
+        magic, _, _, count = struct.unpack('<4H', f.read(8))
+        if magic not in (MAGIC_NUMBER, MAGIC_NUMBER_V2):
+            raise RuntimeError(f"{path} 不是统一字体文件")
+        index = f.read(count * 6)
+        codes = [struct.unpack_from('<H', index, i * 6)[0] for i in range(count)]
+        f.seek(0, 2)
+        f.write(build_buckets(codes))
+    print(f"✓ 已追加分桶表: {path}")
+
+
+def generate_unified_font(output_path, version=2):
     """生成统一字体文件"""
     print("正在加载字体...")
     font = get_system_font()
@@ -127,35 +275,31 @@ def generate_unified_font(output_path):
     
     print(f"总字符数: {total_chars}")
     
-    with open(output_path, 'wb') as f:
-        print("正在写入文件头...")
-        f.write(struct.pack('<H', MAGIC_NUMBER))
-        f.write(struct.pack('<H', FONT_WIDTH))
-        f.write(struct.pack('<H', FONT_HEIGHT))
-        f.write(struct.pack('<H', total_chars))
-        
-        print("正在生成索引表...")
-        data_start_offset = 8 + total_chars * 6
-        
-        for i, char in enumerate(all_chars):
-            unicode_val = ord(char)
-            offset = data_start_offset + i * 32
-            f.write(struct.pack('<H', unicode_val))
-            f.write(struct.pack('<I', offset))
-        
-        print("正在渲染并写入字符位图...")
-        for i, char in enumerate(all_chars):
-            if (i + 1) % 1000 == 0:
-                print(f"  进度: {i + 1}/{total_chars}")
-            
-            bitmap = render_char_to_bitmap(char, font)
-            f.write(bitmap)
+    print("正在渲染字符位图...")
+    glyphs = []
+    for i, char in enumerate(all_chars):
+        if (i + 1) % 1000 == 0:
+            print(f"  进度: {i + 1}/{total_chars}")
+        glyphs.append((ord(char), render_char_to_bitmap(char, font)))
+
+    print(f"正在写入 v{version} 字体文件...")
+    write_font(output_path, glyphs, version=version)
     
     file_size = os.path.getsize(output_path)
     print(f"\n✓ 字体文件生成成功: {output_path}")
     print(f"  文件大小: {file_size / 1024:.1f} KB")
+    if version == 2:
+        v1_size = 8 + total_chars * (6 + FONT_WIDTH // 8 * FONT_HEIGHT) + len(build_buckets([]))
+        print(f"  （v1 格式为 {v1_size / 1024:.1f} KB，节省 {(1 - file_size / v1_size) * 100:.0f}%）")
 
 
 if __name__ == '__main__':
-    output_file = './unified_font.bin'
-    generate_unified_font(output_file)
+    # python3 tools/generate_unified_font.py --buckets [unified_font.bin]：只给旧文件补分桶表
+    if len(sys.argv) > 1 and sys.argv[1] == '--buckets':
+        append_buckets(sys.argv[2] if len(sys.argv) > 2 else './unified_font.bin')
+    elif len(sys.argv) > 1 and sys.argv[1] == '--convert':
+        src = sys.argv[2] if len(sys.argv) > 2 else './unified_font.bin'
+        convert_font(src, sys.argv[3] if len(sys.argv) > 3 else src + '.converted')
+    else:
+        output_file = './unified_font.bin'
+        generate_unified_font(output_file, version=1 if '--v1' in sys.argv else 2)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+字体子集工具
+
+从完整的 unified_font.bin 中按内容挑出实际用到的字形，生成同样格式（与源文件同一版本，
+含分桶表）的小字体文件。两种用法：
+- 字形包：根据 KV 中 info1/info2 的当前内容生成，上传到 KV_BASE_URL + GLYPH_PACK_KEY，
+  设备每次唤醒随内容一起下载，绘制时优先从字形包取字，缺的字再回落到完整字体；
+- 部署子集：根据语料文件生成，直接替代设备上的 unified_font.bin，缩短上传和校验时间。
+
+用法:
+    python3 tools/subset_font.py --kv -o glyphs.bin --upload
+    python3 tools/subset_font.py --text corpus.txt -o unified_font.bin
+"""
+
+import argparse
+import os
+import sys
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_unified_font import ASCII_END, ASCII_START, read_font, write_font  # noqa: E402
+
+# 界面自身会用到的字符（状态栏、错误提示等），与内容无关，始终包含
+UI_CHARS = '°湿度电量'
+KV_KEYS = ('info1', 'info2')
+
+
+def subset_font(src_path, chars, out_path):
+    """
+    把只包含 chars（及 ASCII、界面字符）的字体写到 out_path（与源文件同一格式版本），
+    返回 (字形数, 文件大小, 字库中缺失的字符)
+    """
+    width, height, glyphs, version = read_font(src_path)
+    wanted = {ord(c) for c in chars} | set(range(ASCII_START, ASCII_END + 1)) | {ord(c) for c in UI_CHARS}
+    kept = [(code, bitmap) for code, bitmap in glyphs if code in wanted]
+    have = {code for code, _ in kept}
+    missing = sorted(chr(c) for c in wanted if c not in have and c >= 32)
+    size = write_font(out_path, kept, width, height, version=version)
+    return len(kept), size, missing
+
+
+def fetch_kv(base_url, keys=KV_KEYS):
+    """读取 KV 中的当前内容（不存在的键视为空）"""
+    texts = []
+    for key in keys:
+        try:
+            with urllib.request.urlopen(base_url + key, timeout=10) as response:
+                texts.append(response.read().decode('utf-8', 'replace'))
+        except OSError as e:
+            print(f'跳过 {key}: {e}')
+    return ''.join(texts)
+
+
+def upload(url, data):
+    request = urllib.request.Request(url, data=data, method='POST',
+                                     headers={'Content-Type': 'application/octet-stream'})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--font', default=os.path.join(ROOT, 'unified_font.bin'), help='完整字体文件')
+    parser.add_argument('--text', nargs='*', default=[], help='语料文件')
+    parser.add_argument('--kv', action='store_true', help='从 KV 读取 info1/info2 的当前内容')
+    parser.add_argument('-o', '--out', default='glyphs.bin', help='输出文件')
+    parser.add_argument('--upload', action='store_true', help='上传到 KV_BASE_URL + GLYPH_PACK_KEY')
+    args = parser.parse_args()
+
+    import config
+    chars = ''
+    for path in args.text:
+        with open(path, encoding='utf-8') as f:
+            chars += f.read()
+    if args.kv:
+        chars += fetch_kv(config.KV_BASE_URL)
+
+    count, size, missing = subset_font(args.font, chars, args.out)
+    print(f'✓ {args.out}: {count} 个字形，{size / 1024:.1f} KB '
+          f'（完整字体 {os.path.getsize(args.font) / 1024:.1f} KB）')
+    if missing:
+        print(f'  字库中没有的字符: {"".join(missing)}')
+    if args.upload:
+        url = config.KV_BASE_URL + config.GLYPH_PACK_KEY
+        with open(args.out, 'rb') as f:
+            print(f'上传到 {url}: HTTP {upload(url, f.read())}')
+
+
+if __name__ == '__main__':
+    main()